@@ -1,7 +1,15 @@
 """toolplot is a alternative API to plotting backends"""
 
+from .plot_animate import *
+from .plot_archive import *
 from .plot_create import *
+from .plot_decimate import *
+from .plot_figures import *
+from .plot_fonts import *
+from .plot_profile import *
+from .plot_report import *
 from .plot_save import *
+from .plot_series import *
 from .plot_setup import *
 from .plot_ticks import *
 from .special_plots import *
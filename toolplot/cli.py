@@ -0,0 +1,275 @@
+from __future__ import annotations
+
+import argparse
+import os
+import typing
+
+if typing.TYPE_CHECKING:
+    import concurrent.futures
+
+
+spec_extensions = ('.json', '.toml')
+
+
+def run_cli(args: typing.Sequence[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog='toolplot', description='render toolplot spec files'
+    )
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    render_parser = subparsers.add_parser(
+        'render', help='render PlotData / plot_groups spec files'
+    )
+    render_parser.add_argument(
+        'specs', nargs='+', help='spec files or directories of spec files'
+    )
+    render_parser.add_argument(
+        '-o', '--output-dir', help='output directory, default spec directory'
+    )
+    render_parser.add_argument(
+        '-f',
+        '--formats',
+        help='comma-separated output formats, e.g. png,svg,html',
+    )
+    render_parser.add_argument(
+        '-j', '--jobs', type=int, help='number of worker processes'
+    )
+    render_parser.add_argument(
+        '--watch',
+        action='store_true',
+        help='re-render specs whenever their spec or data files change',
+    )
+    render_parser.add_argument(
+        '--interval',
+        type=float,
+        default=0.5,
+        help='polling interval of --watch in seconds',
+    )
+    render_parser.add_argument(
+        '--setup-formatting',
+        action='store_true',
+        help='apply setup_plot_formatting() in each worker',
+    )
+
+    report_parser = subparsers.add_parser(
+        'report', help='write PlotData spec files as pages of one pdf'
+    )
+    report_parser.add_argument(
+        'specs', nargs='+', help='spec files or directories of spec files'
+    )
+    report_parser.add_argument(
+        '-o', '--output', required=True, help='path of output pdf'
+    )
+    report_parser.add_argument(
+        '--setup-formatting',
+        action='store_true',
+        help='apply setup_plot_formatting() before rendering',
+    )
+
+    serve_parser = subparsers.add_parser(
+        'serve', help='serve render requests from a pool of warm workers'
+    )
+    serve_parser.add_argument('--host', default='127.0.0.1')
+    serve_parser.add_argument('--port', type=int, default=8765)
+    serve_parser.add_argument(
+        '--socket', help='bind to this unix socket instead of host:port'
+    )
+    serve_parser.add_argument(
+        '-j', '--workers', type=int, help='number of worker processes'
+    )
+    serve_parser.add_argument(
+        '--timeout',
+        type=float,
+        default=60,
+        help='per-request render timeout in seconds',
+    )
+    serve_parser.add_argument(
+        '--max-queue',
+        type=int,
+        default=64,
+        help='max requests queued or rendering before rejecting new ones',
+    )
+    serve_parser.add_argument(
+        '--base-dir',
+        default='.',
+        help='directory that data paths of requests are relative to',
+    )
+    serve_parser.add_argument(
+        '--setup-formatting',
+        action='store_true',
+        help='apply setup_plot_formatting() in each worker',
+    )
+    serve_parser.add_argument(
+        '--quiet', action='store_true', help='do not log each request'
+    )
+
+    parsed = parser.parse_args(args)
+    if parsed.command == 'render':
+        if parsed.formats is not None:
+            formats = parsed.formats.split(',')
+        else:
+            formats = None
+        render_spec_files(
+            parsed.specs,
+            output_dir=parsed.output_dir,
+            formats=formats,
+            n_jobs=parsed.jobs,
+            watch=parsed.watch,
+            interval=parsed.interval,
+            setup_formatting=parsed.setup_formatting,
+        )
+    elif parsed.command == 'report':
+        from . import plot_report
+
+        plot_report.write_pdf_report(
+            parsed.output,
+            _iterate_report_pages(parsed.specs),
+            setup_formatting=parsed.setup_formatting,
+        )
+    elif parsed.command == 'serve':
+        from . import plot_server
+
+        plot_server.serve(
+            host=parsed.host,
+            port=parsed.port,
+            socket_path=parsed.socket,
+            n_workers=parsed.workers,
+            timeout=parsed.timeout,
+            max_queue=parsed.max_queue,
+            base_dir=parsed.base_dir,
+            setup_formatting=parsed.setup_formatting,
+            verbose=not parsed.quiet,
+        )
+    else:
+        raise Exception('unknown command: ' + str(parsed.command))
+
+
+def render_spec_files(
+    specs: typing.Sequence[str],
+    *,
+    output_dir: str | None = None,
+    formats: typing.Sequence[str] | None = None,
+    n_jobs: int | None = None,
+    watch: bool = False,
+    interval: float = 0.5,
+    setup_formatting: bool = False,
+) -> None:
+    """render spec files in parallel on a pool of warm worker processes
+
+    with watch=True, keep polling and re-render only specs whose spec file or
+    referenced data files changed
+    """
+    import concurrent.futures
+    import time
+
+    from . import plot_render
+
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=n_jobs,
+        initializer=plot_render._warm_worker,
+        initargs=(setup_formatting,),
+    ) as executor:
+        mtimes: dict[str, dict[str, float | None]] = {}
+        while True:
+            stale = []
+            for path in _find_spec_files(specs):
+                current = _get_mtimes(path)
+                if mtimes.get(path) != current:
+                    mtimes[path] = current
+                    stale.append(path)
+
+            if len(stale) > 0:
+                _render_batch(executor, stale, output_dir, formats)
+            if not watch:
+                break
+            time.sleep(interval)
+
+
+def _render_batch(
+    executor: concurrent.futures.Executor,
+    paths: typing.Sequence[str],
+    output_dir: str | None,
+    formats: typing.Sequence[str] | None,
+) -> None:
+    import concurrent.futures
+    import time
+
+    from . import plot_render
+
+    t_start = time.time()
+    futures = {
+        executor.submit(
+            plot_render.render_spec_file, path, output_dir, formats
+        ): path
+        for path in paths
+    }
+    n_failed = 0
+    for future in concurrent.futures.as_completed(futures):
+        path = futures[future]
+        try:
+            output_paths = future.result()
+        except Exception as e:
+            n_failed += 1
+            print('[failed]', path + ':', type(e).__name__ + ':', e)
+        else:
+            for output_path in output_paths:
+                print('rendered', path, '->', output_path)
+    print(
+        'rendered',
+        len(paths) - n_failed,
+        'of',
+        len(paths),
+        'specs in',
+        '%.2f' % (time.time() - t_start),
+        'seconds',
+    )
+
+
+def _iterate_report_pages(
+    specs: typing.Sequence[str],
+) -> typing.Iterator[dict[str, typing.Any]]:
+    """load PlotData of each spec file, one at a time"""
+    from . import plot_render
+
+    for path in _find_spec_files(specs):
+        spec = plot_render.load_spec_file(path)
+        if plot_render.get_spec_kind(spec) != 'plot_data':
+            raise Exception('report pages must be plot_data specs: ' + path)
+        base_dir = os.path.dirname(os.path.abspath(path))
+        yield plot_render._rebase_series_references(spec['plot_data'], base_dir)
+
+
+def _find_spec_files(specs: typing.Sequence[str]) -> list[str]:
+    paths = []
+    for spec in specs:
+        if os.path.isdir(spec):
+            for filename in sorted(os.listdir(spec)):
+                if filename.endswith(spec_extensions):
+                    paths.append(os.path.join(spec, filename))
+        else:
+            paths.append(spec)
+    return paths
+
+
+def _get_mtimes(path: str) -> dict[str, float | None]:
+    """get mtimes of spec file and of every data file it references"""
+    from . import plot_render
+
+    mtimes = {path: _get_mtime(path)}
+    try:
+        spec = plot_render.load_spec_file(path)
+        base_dir = os.path.dirname(os.path.abspath(path))
+        dependencies = plot_render.get_spec_dependencies(spec, base_dir)
+    except Exception:
+        # invalid specs are re-rendered on change so their error is reported
+        dependencies = []
+    for dependency in dependencies:
+        mtimes[dependency] = _get_mtime(dependency)
+    return mtimes
+
+
+def _get_mtime(path: str) -> float | None:
+    try:
+        return os.stat(path).st_mtime
+    except FileNotFoundError:
+        return None
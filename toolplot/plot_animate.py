@@ -0,0 +1,342 @@
+"""frame-sequence animations of a PlotData template
+
+the figure and its layout are built once from the template. each frame only
+replaces the data of the template's artists, draws the figure on an Agg
+canvas, and hands the pixel buffer to an encoder thread, which writes a gif
+or a sequence of png files
+
+a frame maps plot ids of the template to updates of their PlotDatum, using
+the keys in animated_keys. ys updates are matched to the template's ys by
+position, and hist values are counted in the template's bins
+"""
+
+from __future__ import annotations
+
+import threading
+import typing
+
+if typing.TYPE_CHECKING:
+    import queue
+
+    import matplotlib.artist
+    import matplotlib.axes
+    import matplotlib.figure
+    import matplotlib.lines
+    import numpy as np
+
+
+animated_keys = ['x', 'y', 'ys', 'hist', 'title', 'xlim', 'ylim']
+
+
+def render_animation(
+    template: typing.Mapping[str, typing.Any],
+    frames: typing.Iterable[
+        typing.Mapping[str, typing.Mapping[str, typing.Any]]
+    ],
+    path: str,
+    *,
+    fps: float = 10,
+    dpi: float | None = None,
+    autoscale: bool = True,
+    max_queue: int = 8,
+    verbose: bool = True,
+) -> int:
+    """render frames as a gif, or as png files, returning number of frames
+
+    path either ends in .gif, or contains a {} placeholder for the frame
+    index, e.g. 'frames/frame_{:05d}.png'
+
+    with autoscale, axes limits follow each frame's data, like separate
+    plot_subplots() calls would. otherwise limits stay those of the template,
+    and each frame only redraws the data artists over a cached background
+
+    at most max_queue rendered frames wait for the encoder
+    """
+    import os
+    import queue
+    import time
+
+    import matplotlib.pyplot as plt
+    import numpy as np
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    from . import plot_create
+    from . import plot_profile
+
+    if not path.endswith('.gif') and '{' not in path:
+        raise Exception('path must end in .gif or contain a {} placeholder')
+    if os.path.dirname(path) != '':
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    t_start = time.time()
+    fig = plot_create.plot_subplots(template)
+    try:
+        if dpi is not None:
+            fig.set_dpi(dpi)
+        # backend_agg has no type stubs
+        canvas: typing.Any = FigureCanvasAgg(fig)
+        common = template.get('common', {})
+        targets = {
+            plot_id: _PlotTarget(
+                ax, plot_create._apply_common(plot_datum, common)
+            )
+            for ax, (plot_id, plot_datum) in zip(
+                fig.axes, template['plots'].items()
+            )
+        }
+
+        # lay out once, frames reuse the positions of the first draw
+        canvas.draw()
+        fig.set_layout_engine('none')
+        _freeze_legends(fig)
+        if not autoscale:
+            artists = [
+                artist
+                for target in targets.values()
+                for artist in target.get_artists()
+            ]
+            for artist in artists:
+                artist.set_animated(True)
+            canvas.draw()
+            background = canvas.copy_from_bbox(fig.bbox)
+
+        pixel_queue: queue.Queue[np.ndarray[typing.Any, typing.Any] | None]
+        pixel_queue = queue.Queue(maxsize=max_queue)
+        encoder = _FrameEncoder(path, fps, pixel_queue)
+        encoder.start()
+        n_frames = 0
+        try:
+            for frame in frames:
+                with plot_profile._stage('render_frame', label=str(n_frames)):
+                    for plot_id, update in frame.items():
+                        if plot_id not in targets:
+                            raise Exception('unknown plot id: ' + str(plot_id))
+                        targets[plot_id].update(update, autoscale=autoscale)
+                    if autoscale:
+                        canvas.draw()
+                    else:
+                        canvas.restore_region(background)
+                        for artist in artists:
+                            fig.draw_artist(artist)
+                    pixels = np.array(canvas.buffer_rgba())
+                pixel_queue.put(pixels)
+                n_frames += 1
+        finally:
+            pixel_queue.put(None)
+            encoder.join()
+        if encoder.error is not None:
+            raise encoder.error
+    finally:
+        plt.close(fig)
+
+    if verbose:
+        seconds = time.time() - t_start
+        print(
+            'wrote',
+            n_frames,
+            'frames to',
+            path,
+            'in',
+            '%.2f' % seconds,
+            'seconds',
+            '(%.0f frames per minute)' % (60 * n_frames / max(seconds, 1e-9)),
+        )
+    return n_frames
+
+
+class _PlotTarget:
+    """artists of one subplot that frames update"""
+
+    def __init__(
+        self,
+        ax: matplotlib.axes.Axes,
+        plot_datum: typing.Mapping[str, typing.Any],
+    ) -> None:
+        from matplotlib.container import BarContainer
+
+        self.ax = ax
+        self.x = plot_datum.get('x')
+        n_lines = len(plot_datum.get('ys') or [])
+        self.has_y = plot_datum.get('y') is not None
+        if self.has_y:
+            n_lines += 1
+        self.lines: list[matplotlib.lines.Line2D] = list(ax.lines[:n_lines])
+        self.bars = [
+            container
+            for container in ax.containers
+            if isinstance(container, BarContainer)
+        ]
+        hist_kwargs = plot_datum.get('hist_kwargs', {})
+        self.density = hist_kwargs.get('density', False)
+
+    def get_artists(self) -> list[matplotlib.artist.Artist]:
+        artists: list[matplotlib.artist.Artist] = list(self.lines)
+        for container in self.bars:
+            artists.extend(container.patches)
+        artists.append(self.ax.title)
+        return artists
+
+    def update(
+        self, update: typing.Mapping[str, typing.Any], autoscale: bool
+    ) -> None:
+        from . import plot_series
+
+        for key in update.keys():
+            if key not in animated_keys:
+                raise Exception('cannot animate PlotDatum key: ' + str(key))
+        if not autoscale and ('xlim' in update or 'ylim' in update):
+            raise Exception('xlim and ylim updates require autoscale')
+
+        if update.get('x') is not None:
+            self.x = plot_series.load_series(update['x'])
+        ys = list(update.get('ys') or [])
+        if len(ys) + self.has_y > len(self.lines):
+            raise Exception('frame has more lines than template')
+        if update.get('y') is not None:
+            if not self.has_y:
+                raise Exception('template has no y to update')
+            self._set_line_data(self.lines[0], self.x, update['y'])
+        for line, subplot in zip(self.lines[self.has_y :], ys):
+            sub_x = subplot.get('x')
+            if sub_x is None:
+                sub_x = self.x
+            self._set_line_data(line, sub_x, subplot['y'])
+        if update.get('hist') is not None:
+            self._set_hist_data(plot_series.load_series(update['hist']))
+
+        if update.get('title') is not None:
+            self.ax.set_title(update['title'])
+        if autoscale:
+            self._update_data_limits()
+            self.ax.autoscale_view()
+        if update.get('xlim') is not None:
+            self.ax.set_xlim(update['xlim'])
+        if update.get('ylim') is not None:
+            self.ax.set_ylim(update['ylim'])
+
+    def _update_data_limits(self) -> None:
+        """like ax.relim(), but from animated artists only
+
+        relim() measures each bar through its path, which costs more than
+        drawing the frame
+        """
+        import numpy as np
+        from matplotlib.transforms import Bbox
+
+        points = [line.get_xydata() for line in self.lines]
+        for container in self.bars:
+            for patch in container.patches:
+                x, y = patch.get_xy()
+                width, height = patch.get_width(), patch.get_height()
+                points.append(np.array([[x, y], [x + width, y + height]]))
+        self.ax.dataLim.set_points(Bbox.null().get_points())
+        self.ax.ignore_existing_data_limits = True
+        if len(points) > 0:
+            self.ax.update_datalim(np.concatenate(points))
+
+    def _set_line_data(
+        self,
+        line: matplotlib.lines.Line2D,
+        x: typing.Any,
+        y: typing.Any,
+    ) -> None:
+        import numpy as np
+
+        from . import plot_decimate
+        from . import plot_series
+
+        y = np.asarray(plot_series.load_series(y))
+        if x is None:
+            x = np.arange(len(y))
+        else:
+            x = np.asarray(plot_series.load_series(x))
+        if isinstance(line, plot_decimate.DecimatedLine):
+            xaxis: typing.Any = self.ax.xaxis
+            x_values = np.asarray(xaxis.convert_units(x), dtype=float)
+            if x_values.shape != y.shape or not np.all(np.diff(x_values) >= 0):
+                raise Exception('decimated lines need ascending x per frame')
+            line.set_full_data(x, y, x_values)
+        else:
+            line.set_data(x, y)
+
+    def _set_hist_data(self, values: typing.Any) -> None:
+        import numpy as np
+
+        if len(self.bars) != 1:
+            raise Exception('hist updates need a template with one bar hist')
+        patches = self.bars[0].patches
+        edges = [patch.get_x() for patch in patches]
+        edges.append(patches[-1].get_x() + patches[-1].get_width())
+        counts, _ = np.histogram(values, edges, density=self.density)
+        for patch, count in zip(patches, counts):
+            patch.set_height(count)
+
+
+def _freeze_legends(fig: matplotlib.figure.Figure) -> None:
+    """pin loc='best' legends where they were drawn
+
+    finding the best location tests every data point, on every draw
+    """
+    for ax in fig.axes:
+        legend = ax.get_legend()
+        if legend is None or getattr(legend, '_loc', None) != 0:
+            continue
+        if not hasattr(legend, 'set_loc'):
+            continue
+        corner = legend.get_window_extent().p0
+        legend.set_loc(tuple(ax.transAxes.inverted().transform(corner)))
+
+
+class _FrameEncoder(threading.Thread):
+    """encode queued rgba frames until a None arrives
+
+    after an error, frames are still drained so that the renderer never
+    blocks on a full queue
+    """
+
+    def __init__(
+        self,
+        path: str,
+        fps: float,
+        pixel_queue: queue.Queue[np.ndarray[typing.Any, typing.Any] | None],
+    ) -> None:
+        super().__init__(daemon=True)
+        self.path = path
+        self.fps = fps
+        self.pixel_queue = pixel_queue
+        self.error: BaseException | None = None
+
+    def run(self) -> None:
+        from PIL import Image
+
+        gif = self.path.endswith('.gif')
+        images = []
+        index = 0
+        while True:
+            pixels = self.pixel_queue.get()
+            if pixels is None:
+                break
+            if self.error is not None:
+                continue
+            try:
+                image = Image.fromarray(pixels).convert('RGB')
+                if gif:
+                    method = Image.Quantize.FASTOCTREE
+                    images.append(image.quantize(method=method))
+                else:
+                    image.save(self.path.format(index))
+                index += 1
+            except BaseException as e:
+                self.error = e
+
+        if gif and len(images) > 0 and self.error is None:
+            try:
+                images[0].save(
+                    self.path,
+                    save_all=True,
+                    append_images=images[1:],
+                    duration=1000 / self.fps,
+                    loop=0,
+                )
+            except BaseException as e:
+                self.error = e
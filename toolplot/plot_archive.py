@@ -0,0 +1,309 @@
+"""content-addressed archive of saved figures
+
+layout of an archive directory
+- objects/<hash[:2]>/<hash>.<format>    each distinct file content, once
+- index.sqlite                          one row per archived save
+- <format>/<timestamp>__<name>.<format> hardlinks to objects, for browsing
+
+saving an unchanged figure adds an index row and a hardlink, not a copy
+"""
+
+from __future__ import annotations
+
+import contextlib
+import os
+import typing
+
+from typing_extensions import TypedDict
+
+if typing.TYPE_CHECKING:
+    import sqlite3
+
+
+class ArchiveEntry(TypedDict):
+    name: str
+    format: str
+    timestamp: float
+    label: str
+    hash: str
+    size: int
+    path: str
+
+
+index_filename = 'index.sqlite'
+
+_schema = """
+CREATE TABLE IF NOT EXISTS entries (
+    name TEXT NOT NULL,
+    format TEXT NOT NULL,
+    timestamp REAL NOT NULL,
+    label TEXT NOT NULL,
+    hash TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    view TEXT
+);
+CREATE INDEX IF NOT EXISTS entries_lookup
+    ON entries (name, format, timestamp);
+CREATE INDEX IF NOT EXISTS entries_hash ON entries (hash);
+"""
+
+
+def archive_figure(
+    archive_dir: str,
+    name: str,
+    paths: typing.Mapping[str, str],
+    *,
+    timestamp: float | None = None,
+    link: bool = True,
+) -> list[ArchiveEntry]:
+    """archive saved figure files, given as {format: path}
+
+    with link, each entry also gets a hardlinked <timestamp>__<name> view
+    """
+    import time
+
+    import tooltime
+
+    if timestamp is None:
+        timestamp = time.time()
+    label = tooltime.create_timestamp_label(timestamp)
+
+    entries: list[ArchiveEntry] = []
+    with _open_index(archive_dir, write=True) as connection:
+        for format, path in paths.items():
+            hash, size = _hash_file(path)
+            object_path = _get_object_path(archive_dir, hash, format)
+            if not os.path.exists(object_path):
+                _store_object(path, object_path)
+
+            view = None
+            if link:
+                view = os.path.join(format, label + '__' + name + '.' + format)
+                _link_view(object_path, os.path.join(archive_dir, view))
+
+            connection.execute(
+                'INSERT INTO entries VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (name, format, timestamp, label, hash, size, view),
+            )
+            entries.append(
+                {
+                    'name': name,
+                    'format': format,
+                    'timestamp': timestamp,
+                    'label': label,
+                    'hash': hash,
+                    'size': size,
+                    'path': object_path,
+                }
+            )
+    return entries
+
+
+def get_archived_figure(
+    archive_dir: str,
+    name: str,
+    format: str = 'png',
+    as_of: float | None = None,
+) -> ArchiveEntry | None:
+    """get latest archived version of figure saved at or before as_of"""
+    query = (
+        'SELECT name, format, timestamp, label, hash, size FROM entries'
+        ' WHERE name = ? AND format = ?'
+    )
+    params: list[typing.Any] = [name, format]
+    if as_of is not None:
+        query += ' AND timestamp <= ?'
+        params.append(as_of)
+    query += ' ORDER BY timestamp DESC, rowid DESC LIMIT 1'
+    with _open_index(archive_dir) as connection:
+        row = connection.execute(query, params).fetchone()
+    if row is None:
+        return None
+    return _row_to_entry(archive_dir, row)
+
+
+def list_archived_figures(
+    archive_dir: str,
+    name: str | None = None,
+    format: str | None = None,
+) -> list[ArchiveEntry]:
+    """list archive entries in order of save time"""
+    query = 'SELECT name, format, timestamp, label, hash, size FROM entries'
+    conditions = []
+    params = []
+    if name is not None:
+        conditions.append('name = ?')
+        params.append(name)
+    if format is not None:
+        conditions.append('format = ?')
+        params.append(format)
+    if len(conditions) > 0:
+        query += ' WHERE ' + ' AND '.join(conditions)
+    query += ' ORDER BY timestamp, rowid'
+    with _open_index(archive_dir) as connection:
+        rows = connection.execute(query, params).fetchall()
+    return [_row_to_entry(archive_dir, row) for row in rows]
+
+
+def prune_archive(
+    archive_dir: str,
+    *,
+    keep_last: int | None = None,
+    keep_daily: int | None = None,
+    name: str | None = None,
+) -> int:
+    """delete archive entries outside of retention policy
+
+    for each figure name and format, keep the keep_last most recent entries
+    and the last entry of each of the keep_daily most recent days (utc).
+    objects that are no longer referenced are deleted. returns number of
+    deleted entries
+    """
+    if keep_last is None and keep_daily is None:
+        raise Exception('specify keep_last or keep_daily')
+
+    query = 'SELECT rowid, name, format, timestamp, view FROM entries'
+    params = []
+    if name is not None:
+        query += ' WHERE name = ?'
+        params.append(name)
+    query += ' ORDER BY timestamp DESC, rowid DESC'
+
+    with _open_index(archive_dir, write=True) as connection:
+        rows = connection.execute(query, params).fetchall()
+
+        keep = set()
+        n_kept: dict[tuple[str, str], int] = {}
+        days: dict[tuple[str, str], list[int]] = {}
+        for rowid, entry_name, format, timestamp, view in rows:
+            key = (entry_name, format)
+            if keep_last is not None and n_kept.get(key, 0) < keep_last:
+                keep.add(rowid)
+                n_kept[key] = n_kept.get(key, 0) + 1
+            if keep_daily is not None:
+                day = int(timestamp // 86400)
+                kept_days = days.setdefault(key, [])
+                if day not in kept_days and len(kept_days) < keep_daily:
+                    kept_days.append(day)
+                    keep.add(rowid)
+
+        deleted = [row for row in rows if row[0] not in keep]
+        for rowid, _, _, _, _ in deleted:
+            connection.execute('DELETE FROM entries WHERE rowid = ?', (rowid,))
+
+        # saves within the same second share a view
+        for _, _, _, _, view in deleted:
+            if view is not None:
+                (n_references,) = connection.execute(
+                    'SELECT COUNT(*) FROM entries WHERE view = ?', (view,)
+                ).fetchone()
+                if n_references == 0:
+                    _remove_file(os.path.join(archive_dir, view))
+        _collect_garbage(archive_dir, connection)
+
+    return len(deleted)
+
+
+@contextlib.contextmanager
+def _open_index(
+    archive_dir: str, write: bool = False
+) -> typing.Iterator[sqlite3.Connection]:
+    """open archive index, committing on success and always closing
+
+    with write, the index write lock is held from the start. archiving holds
+    it while storing objects, so that garbage collection, which also holds
+    it, never sees an object whose entry is not yet inserted
+    """
+    import sqlite3
+
+    os.makedirs(archive_dir, exist_ok=True)
+    path = os.path.join(archive_dir, index_filename)
+    connection = sqlite3.connect(path, timeout=30)
+    try:
+        connection.executescript(_schema)
+        with connection:
+            if write:
+                connection.execute('BEGIN IMMEDIATE')
+            yield connection
+    finally:
+        connection.close()
+
+
+def _row_to_entry(
+    archive_dir: str, row: tuple[typing.Any, ...]
+) -> ArchiveEntry:
+    name, format, timestamp, label, hash, size = row
+    return {
+        'name': name,
+        'format': format,
+        'timestamp': timestamp,
+        'label': label,
+        'hash': hash,
+        'size': size,
+        'path': _get_object_path(archive_dir, hash, format),
+    }
+
+
+def _hash_file(path: str) -> tuple[str, int]:
+    import hashlib
+
+    hasher = hashlib.sha256()
+    size = 0
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            hasher.update(chunk)
+            size += len(chunk)
+    return hasher.hexdigest(), size
+
+
+def _get_object_path(archive_dir: str, hash: str, format: str) -> str:
+    return os.path.join(archive_dir, 'objects', hash[:2], hash + '.' + format)
+
+
+def _store_object(path: str, object_path: str) -> None:
+    import shutil
+
+    os.makedirs(os.path.dirname(object_path), exist_ok=True)
+    tmp_path = object_path + '.' + str(os.getpid()) + '.tmp'
+    shutil.copyfile(path, tmp_path)
+    os.replace(tmp_path, object_path)
+
+
+def _link_view(object_path: str, view_path: str) -> None:
+    """hardlink view to object, or fall back to a copy if links fail"""
+    import shutil
+
+    os.makedirs(os.path.dirname(view_path), exist_ok=True)
+    _remove_file(view_path)
+    try:
+        os.link(object_path, view_path)
+    except OSError:
+        shutil.copyfile(object_path, view_path)
+
+
+def _remove_file(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _collect_garbage(archive_dir: str, connection: sqlite3.Connection) -> None:
+    """delete objects that no entry references
+
+    must run under the write lock of _open_index(), so no object is being
+    stored, and any .tmp file is left over from a failed store
+    """
+    objects_dir = os.path.join(archive_dir, 'objects')
+    if not os.path.isdir(objects_dir):
+        return
+    referenced = {
+        hash
+        for (hash,) in connection.execute('SELECT DISTINCT hash FROM entries')
+    }
+    for subdir in os.listdir(objects_dir):
+        subdir_path = os.path.join(objects_dir, subdir)
+        for filename in os.listdir(subdir_path):
+            hash = filename.split('.')[0]
+            if hash not in referenced:
+                _remove_file(os.path.join(subdir_path, filename))
@@ -1,8 +1,14 @@
+from __future__ import annotations
+
 import typing
 
 import matplotlib.pyplot as plt
 import numpy as np
 
+from . import plot_decimate
+from . import plot_figures
+from . import plot_profile
+from . import plot_series
 from . import plot_ticks
 
 
@@ -26,6 +32,7 @@ plot_specs = {
         'y': 'Series',
         'y_kwargs': 'Map',
         'ys': [{'y': 'Series', 'y_kwargs': 'Map'}],
+        'decimate': 'Boolean',
         'stacks': ['Series'],
         'stacks_kwargs': 'Map',
         'hist': 'Series',
@@ -40,24 +47,32 @@ plot_specs = {
         'title': 'Text',
         'legend_kwargs': 'Map',
     },
+    'Series': ['Sequence', 'SeriesReference'],
+    'SeriesReference': {
+        'path': 'Text',
+        'column': 'Text',
+        'slice': ['Integer', 'Integer'],
+        'format': ['parquet', 'ipc', None],
+    },
 }
 
 
 def plot(plot_datum):
     legend = False
 
+    # load referenced series, they are released once plotting finishes
+    plot_datum = _load_series_references(plot_datum)
+
     # extract args
     x = plot_datum.get('x')
+    decimate = plot_datum.get('decimate', True)
 
     if plot_datum.get('y') is not None:
         y = plot_datum['y']
         y_kwargs = plot_datum.get('y_kwargs', {})
 
         # plot points
-        if x is not None:
-            plt.plot(x, y, **y_kwargs)
-        else:
-            plt.plot(y, **y_kwargs)
+        _plot_line(x, y, y_kwargs, decimate)
 
     if plot_datum.get('ys'):
         for subplot in plot_datum['ys']:
@@ -68,10 +83,7 @@ def plot(plot_datum):
             y_kwargs = subplot.get('y_kwargs', {})
 
             # plot points
-            if sub_x is not None:
-                plt.plot(sub_x, y, **y_kwargs)
-            else:
-                plt.plot(y, **y_kwargs)
+            _plot_line(sub_x, y, y_kwargs, decimate)
 
             if y_kwargs.get('label') is not None:
                 legend = True
@@ -105,10 +117,11 @@ def plot(plot_datum):
         else:
             raise Exception('unknown position for name: ' + str(name_position))
 
-    if plot_datum.get('xtick_format') is not None:
-        plot_ticks.format_xticks(**plot_datum.get('xtick_format'))
-    if plot_datum.get('ytick_format') is not None:
-        plot_ticks.format_yticks(**plot_datum.get('ytick_format'))
+    with plot_profile._stage('format_ticks'):
+        if plot_datum.get('xtick_format') is not None:
+            plot_ticks.format_xticks(**plot_datum.get('xtick_format'))
+        if plot_datum.get('ytick_format') is not None:
+            plot_ticks.format_yticks(**plot_datum.get('ytick_format'))
 
     title = plot_datum.get('title')
     if title is not None:
@@ -125,7 +138,8 @@ def plot(plot_datum):
     if plot_datum.get('ylim') is not None:
         plt.ylim(plot_datum['ylim'])
     if plot_datum.get('tickgrid'):
-        plot_ticks.add_tick_grid()
+        with plot_profile._stage('format_ticks'):
+            plot_ticks.add_tick_grid()
 
     if plot_datum.get('xlabel') is not None:
         plt.xlabel(plot_datum['xlabel'])
@@ -133,9 +147,10 @@ def plot(plot_datum):
         plt.ylabel(plot_datum['ylabel'])
 
 
-def plot_subplots(plot_data):
+def plot_subplots(
+    plot_data: typing.Mapping[str, typing.Any],
+) -> plt.Figure:
     common = plot_data.get('common', {})
-    merge = common.get('merge')
     n_subplots = len(plot_data['plots'])
 
     if n_subplots == 0:
@@ -147,19 +162,88 @@ def plot_subplots(plot_data):
     figure = plot_data.get('figure', {})
     subplot_height = plot_data.get('subplot_height', 3)
     figure.setdefault('figsize', [10, subplot_height * n_rows])
-    plt.figure(**figure)
+    with plot_profile._stage('create_figure'):
+        fig = plot_figures.create_figure(**figure)
     for sp, (plot_id, plot_datum) in enumerate(plot_data['plots'].items()):
-        plot_datum = dict(plot_datum)
-        for key, value in common.items():
-            if key == 'merge':
-                for subkey, subvalue in merge.items():
-                    plot_datum.setdefault(subkey, {})
-                    plot_datum[subkey] = dict(subvalue, **plot_datum[subkey])
-            elif key not in plot_datum:
-                plot_datum[key] = value
+        plot_datum = _apply_common(plot_datum, common)
 
         # create plot
-        plt.subplot(n_rows, n_columns, sp + 1)
-        if sp == 0 and plot_data.get('title') is not None:
-            plt.title(plot_data['title'])
-        plot(plot_datum=plot_datum)
+        if plot_profile.is_profiling():
+            n_points = _count_points(plot_datum)
+        else:
+            n_points = None
+        with plot_profile._stage('plot', label=str(plot_id), n_points=n_points):
+            plt.subplot(n_rows, n_columns, sp + 1)
+            if sp == 0 and plot_data.get('title') is not None:
+                plt.title(plot_data['title'])
+            plot(plot_datum=plot_datum)
+
+    return fig
+
+
+def _apply_common(
+    plot_datum: typing.Mapping[str, typing.Any],
+    common: typing.Mapping[str, typing.Any],
+) -> dict[str, typing.Any]:
+    """fill in PlotDatum keys from common, merging maps listed in merge"""
+    merged = dict(plot_datum)
+    for key, value in common.items():
+        if key == 'merge':
+            for subkey, subvalue in value.items():
+                merged.setdefault(subkey, {})
+                merged[subkey] = dict(subvalue, **merged[subkey])
+        elif key not in merged:
+            merged[key] = value
+    return merged
+
+
+def _plot_line(
+    x: typing.Any,
+    y: typing.Any,
+    y_kwargs: typing.Mapping[str, typing.Any],
+    decimate: bool,
+) -> None:
+    """plot line, decimating long series to the axes' pixel columns"""
+    if decimate:
+        plot_decimate.plot_line(x, y, **y_kwargs)
+    elif x is not None:
+        plt.plot(x, y, **y_kwargs)
+    else:
+        plt.plot(y, **y_kwargs)
+
+
+def _load_series_references(
+    plot_datum: typing.Mapping[str, typing.Any],
+) -> dict[str, typing.Any]:
+    plot_datum = dict(plot_datum)
+    for key in ['x', 'y', 'hist']:
+        if plot_datum.get(key) is not None:
+            plot_datum[key] = plot_series.load_series(plot_datum[key])
+    if plot_datum.get('ys'):
+        ys = []
+        for subplot in plot_datum['ys']:
+            subplot = dict(subplot)
+            for key in ['x', 'y']:
+                if subplot.get(key) is not None:
+                    subplot[key] = plot_series.load_series(subplot[key])
+            ys.append(subplot)
+        plot_datum['ys'] = ys
+    if plot_datum.get('stacks') is not None:
+        plot_datum['stacks'] = [
+            plot_series.load_series(stack) for stack in plot_datum['stacks']
+        ]
+    return plot_datum
+
+
+def _count_points(plot_datum: typing.Mapping[str, typing.Any]) -> int:
+    """count data points of all series in plot datum"""
+    n_points = 0
+    for key in ['y', 'hist']:
+        if plot_datum.get(key) is not None:
+            n_points += plot_series.get_series_length(plot_datum[key])
+    for subplot in plot_datum.get('ys') or []:
+        if subplot.get('y') is not None:
+            n_points += plot_series.get_series_length(subplot['y'])
+    for stack in plot_datum.get('stacks') or []:
+        n_points += plot_series.get_series_length(stack)
+    return n_points
@@ -0,0 +1,268 @@
+"""min/max decimation of long series
+
+each bucket of consecutive points is reduced to its first, minimum, maximum,
+and last point, in their original order. lines drawn from the decimated
+points cover the same pixels as lines drawn from all points, as long as
+buckets are no wider than a pixel column
+
+plot_line() draws a DecimatedLine, which redoes the decimation at draw time
+for the current axes width in pixels and x view limits
+"""
+
+from __future__ import annotations
+
+import typing
+
+import matplotlib.lines
+
+if typing.TYPE_CHECKING:
+    import matplotlib.axes
+    import matplotlib.backend_bases
+    import numpy as np
+    import numpy.typing as npt
+
+
+# lines with at most this many points per pixel column are drawn as is
+min_points_per_pixel = 4
+
+
+def minmax_indices(
+    values: npt.ArrayLike,
+    bucket_starts: npt.ArrayLike,
+) -> np.ndarray[typing.Any, np.dtype[np.intp]]:
+    """get indices of first, min, max, and last point of each bucket
+
+    bucket_starts are ascending start indices of buckets of values. nan
+    values are ignored by min and max
+    """
+    import numpy as np
+
+    values = np.asarray(values, dtype=float)
+    n = len(values)
+    starts = np.asarray(bucket_starts, dtype=np.intp)
+    starts = starts[(starts >= 0) & (starts < n)]
+    if n == 0 or len(starts) == 0:
+        return np.arange(n)
+    starts = np.unique(np.concatenate([[0], starts]))
+    lengths = np.diff(np.append(starts, n))
+    bucket_ids = np.repeat(np.arange(len(starts)), lengths)
+
+    with np.errstate(invalid='ignore'):
+        bucket_min = np.fmin.reduceat(values, starts)
+        bucket_max = np.fmax.reduceat(values, starts)
+    is_min = values == bucket_min[bucket_ids]
+    is_max = values == bucket_max[bucket_ids]
+
+    indices = np.concatenate(
+        [
+            _first_per_bucket(np.flatnonzero(is_min), bucket_ids),
+            _first_per_bucket(np.flatnonzero(is_max), bucket_ids),
+            starts,
+            np.append(starts[1:] - 1, n - 1),
+        ]
+    )
+    return np.unique(indices).astype(np.intp)
+
+
+def gap_indices(
+    values: npt.ArrayLike,
+) -> np.ndarray[typing.Any, np.dtype[np.intp]]:
+    """get indices that delimit runs of nan values, to keep gaps in lines"""
+    import numpy as np
+
+    is_nan = np.isnan(np.asarray(values, dtype=float))
+    if not is_nan.any():
+        return np.zeros(0, dtype=np.intp)
+    edges = np.flatnonzero(is_nan[1:] != is_nan[:-1])
+    return np.unique(np.concatenate([edges, edges + 1])).astype(np.intp)
+
+
+def _first_per_bucket(
+    indices: np.ndarray[typing.Any, np.dtype[np.intp]],
+    bucket_ids: np.ndarray[typing.Any, np.dtype[np.intp]],
+) -> np.ndarray[typing.Any, np.dtype[np.intp]]:
+    import numpy as np
+
+    _, first = np.unique(bucket_ids[indices], return_index=True)
+    return indices[first]
+
+
+def get_index_buckets(
+    n: int, n_buckets: int
+) -> np.ndarray[typing.Any, np.dtype[np.intp]]:
+    """get starts of n_buckets equal-size buckets of n points"""
+    import numpy as np
+
+    bucket_size = max(int(np.ceil(n / max(n_buckets, 1))), 1)
+    return np.arange(0, n, bucket_size, dtype=np.intp)
+
+
+def get_x_buckets(
+    x: npt.ArrayLike,
+    n_buckets: int,
+    xlim: tuple[float, float] | None = None,
+) -> np.ndarray[typing.Any, np.dtype[np.intp]]:
+    """get starts of buckets of equal width in x, x must be ascending
+
+    points left and right of xlim fall into one bucket each
+    """
+    import numpy as np
+
+    x = np.asarray(x, dtype=float)
+    if len(x) == 0:
+        return np.zeros(0, dtype=np.intp)
+    if xlim is None:
+        xlim = (x[0], x[-1])
+    xmin, xmax = xlim
+    if not xmax > xmin:
+        return np.zeros(1, dtype=np.intp)
+    edges = np.linspace(xmin, xmax, n_buckets + 1)
+    return np.searchsorted(x, edges, side='left').astype(np.intp)
+
+
+def decimate_minmax(
+    x: npt.ArrayLike | None,
+    y: npt.ArrayLike,
+    n_buckets: int,
+) -> tuple[
+    np.ndarray[typing.Any, typing.Any], np.ndarray[typing.Any, typing.Any]
+]:
+    """decimate series into n_buckets equal-size buckets of points
+
+    if x is None, point indices are used as x
+    """
+    import numpy as np
+
+    y = np.asarray(y)
+    if x is None:
+        x = np.arange(len(y))
+    x = np.asarray(x)
+    if len(y) <= 4 * n_buckets:
+        return x, y
+    indices = minmax_indices(y, get_index_buckets(len(y), n_buckets))
+    return x[indices], y[indices]
+
+
+class DecimatedLine(matplotlib.lines.Line2D):
+    """line that only draws the min/max points of each pixel column
+
+    the full data is kept on the line. each draw re-decimates it if the
+    axes width in pixels or the x view limits changed, so zooming in or
+    saving at a higher dpi shows full detail
+    """
+
+    def __init__(
+        self,
+        x: np.ndarray[typing.Any, typing.Any],
+        y: np.ndarray[typing.Any, typing.Any],
+        x_values: np.ndarray[typing.Any, typing.Any],
+        n_buckets: int,
+        **kwargs: typing.Any,
+    ) -> None:
+        self.full_x = x
+        self.full_y = y
+        self.full_x_values = x_values
+        self._decimation_key: tuple[typing.Any, ...] | None = None
+        indices = self._get_indices(n_buckets, None)
+        super().__init__(x[indices], y[indices], **kwargs)
+
+    def _get_indices(
+        self, n_buckets: int, xlim: tuple[float, float] | None
+    ) -> np.ndarray[typing.Any, np.dtype[np.intp]]:
+        import numpy as np
+
+        buckets = get_x_buckets(self.full_x_values, n_buckets, xlim)
+        indices = minmax_indices(self.full_y, buckets)
+        return np.union1d(indices, gap_indices(self.full_y))
+
+    def set_full_data(
+        self,
+        x: np.ndarray[typing.Any, typing.Any],
+        y: np.ndarray[typing.Any, typing.Any],
+        x_values: np.ndarray[typing.Any, typing.Any],
+    ) -> None:
+        """replace full data, x_values are x converted to ascending floats"""
+        self.full_x = x
+        self.full_y = y
+        self.full_x_values = x_values
+        self._decimation_key = None
+        self.update_decimation()
+
+    def update_decimation(self) -> None:
+        """decimate full data for current axes width and x view limits"""
+        import numpy as np
+
+        if self.axes is None:
+            return
+        n_buckets = max(int(np.ceil(self.axes.bbox.width)), 1)
+        xmin, xmax = sorted(self.axes.get_xlim())
+        key = (n_buckets, xmin, xmax)
+        if key == self._decimation_key:
+            return
+        self._decimation_key = key
+        indices = self._get_indices(n_buckets, (xmin, xmax))
+        self.set_data(self.full_x[indices], self.full_y[indices])
+
+    def draw(self, renderer: matplotlib.backend_bases.RendererBase) -> None:
+        self.update_decimation()
+        super().draw(renderer)
+
+
+def plot_line(
+    x: npt.ArrayLike | None,
+    y: npt.ArrayLike,
+    *,
+    ax: matplotlib.axes.Axes | None = None,
+    **kwargs: typing.Any,
+) -> list[matplotlib.lines.Line2D]:
+    """plot line like plt.plot(), decimating it if it has more points than
+    the axes has pixel columns
+
+    lines with markers, non-ascending x, or non-numeric data are plotted as is
+    """
+    import matplotlib.pyplot as plt
+    import numpy as np
+
+    if ax is None:
+        ax = plt.gca()
+    args = (y,) if x is None else (x, y)
+
+    y_array = np.asarray(y)
+    n_buckets = max(int(np.ceil(ax.bbox.width)), 1)
+    if (
+        y_array.ndim != 1
+        or not np.issubdtype(y_array.dtype, np.number)
+        or len(y_array) <= min_points_per_pixel * n_buckets
+        or kwargs.get('marker') not in [None, '', 'None', ' ']
+        or kwargs.get('drawstyle', kwargs.get('ds')) not in [None, 'default']
+    ):
+        return ax.plot(*args, **kwargs)
+
+    # x must convert to ascending floats for buckets of equal width
+    if x is None:
+        x_array = np.arange(len(y_array))
+    else:
+        x_array = np.asarray(x)
+    # unit conversion methods of Axis are untyped
+    xaxis: typing.Any = ax.xaxis
+    try:
+        xaxis.update_units(x_array)
+        x_values = np.asarray(xaxis.convert_units(x_array), dtype=float)
+    except (TypeError, ValueError):
+        return ax.plot(*args, **kwargs)
+    if x_values.shape != y_array.shape or not np.all(np.diff(x_values) >= 0):
+        return ax.plot(*args, **kwargs)
+
+    # plot once to pick up the color cycle, then swap in the decimated line
+    line = DecimatedLine(x_array, y_array, x_values, n_buckets)
+    (template,) = ax.plot(line.get_xdata(), line.get_ydata(), **kwargs)
+    template.remove()
+    line_kwargs = {
+        key: value
+        for key, value in kwargs.items()
+        if key not in ['scalex', 'scaley', 'data']
+    }
+    line_kwargs.setdefault('color', template.get_color())
+    line.update(line_kwargs)
+    ax.add_line(line)
+    return [line]
@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+import contextlib
+import typing
+
+from typing_extensions import TypedDict
+
+if typing.TYPE_CHECKING:
+    import matplotlib.figure
+
+
+class FigureStats(TypedDict):
+    n_live_figures: int
+    n_pooled_figures: int
+    canvas_bytes: int
+    n_created: int
+    n_reused: int
+    n_closed: int
+
+
+class FigureScope:
+    """figures created inside a managed_figures() block
+
+    saved figures are closed, or cleared and kept for reuse if the pool has
+    room. figures still open when the block exits are closed
+    """
+
+    def __init__(self, pool_size: int = 0) -> None:
+        self.pool_size = pool_size
+        self.figures: list[matplotlib.figure.Figure] = []
+        self.pool: dict[typing.Hashable, list[matplotlib.figure.Figure]] = {}
+        self.keys: dict[int, typing.Hashable] = {}
+        self.n_created = 0
+        self.n_reused = 0
+        self.n_closed = 0
+
+    def create_figure(self, **kwargs: typing.Any) -> matplotlib.figure.Figure:
+        import matplotlib.pyplot as plt
+
+        key = _get_pool_key(kwargs)
+        fig = None
+        if key is not None:
+            pooled = self.pool.get(key, [])
+            while len(pooled) > 0 and fig is None:
+                candidate = pooled.pop()
+                if plt.fignum_exists(candidate.number):
+                    fig = candidate
+                    plt.figure(fig.number)
+                    self.n_reused += 1
+        if fig is None:
+            fig = plt.figure(**kwargs)
+            self.n_created += 1
+        self.figures.append(fig)
+        if key is not None:
+            self.keys[id(fig)] = key
+        return fig
+
+    def release_figure(self, fig: matplotlib.figure.Figure) -> None:
+        import matplotlib.pyplot as plt
+
+        if fig not in self.figures:
+            return
+        self.figures.remove(fig)
+        key = self.keys.get(id(fig))
+        if key is not None and self.get_n_pooled() < self.pool_size:
+            fig.clf()
+            self.pool.setdefault(key, []).append(fig)
+        else:
+            self.keys.pop(id(fig), None)
+            plt.close(fig)
+            self.n_closed += 1
+
+    def close_all(self) -> None:
+        import matplotlib.pyplot as plt
+
+        figures = self.figures + [
+            fig for pooled in self.pool.values() for fig in pooled
+        ]
+        for fig in figures:
+            plt.close(fig)
+        self.n_closed += len(figures)
+        self.figures = []
+        self.pool = {}
+        self.keys = {}
+
+    def get_n_pooled(self) -> int:
+        return sum(len(pooled) for pooled in self.pool.values())
+
+
+_active_scopes: list[FigureScope] = []
+
+
+@contextlib.contextmanager
+def managed_figures(pool_size: int = 0) -> typing.Iterator[FigureScope]:
+    """close figures automatically once they are saved
+
+    with pool_size > 0, up to pool_size saved figures are cleared and reused
+    by later plot_subplots calls with the same figure kwargs, which avoids
+    reallocating their canvas
+    """
+    scope = FigureScope(pool_size=pool_size)
+    _active_scopes.append(scope)
+    try:
+        yield scope
+    finally:
+        _active_scopes.remove(scope)
+        scope.close_all()
+
+
+def create_figure(**kwargs: typing.Any) -> matplotlib.figure.Figure:
+    """create figure, reusing a pooled figure if inside managed_figures()"""
+    if len(_active_scopes) > 0:
+        return _active_scopes[-1].create_figure(**kwargs)
+    else:
+        import matplotlib.pyplot as plt
+
+        return plt.figure(**kwargs)
+
+
+def release_figure(fig: matplotlib.figure.Figure) -> None:
+    """close or recycle figure if it belongs to an active managed scope"""
+    for scope in reversed(_active_scopes):
+        if fig in scope.figures:
+            scope.release_figure(fig)
+            return
+
+
+def get_figure_stats() -> FigureStats:
+    """count live pyplot figures and the memory held by their canvases"""
+    from matplotlib._pylab_helpers import Gcf
+
+    managers = Gcf.get_all_fig_managers()
+    canvas_bytes = 0
+    for manager in managers:
+        canvas_bytes += _get_canvas_bytes(manager.canvas.figure)
+
+    stats: FigureStats = {
+        'n_live_figures': len(managers),
+        'n_pooled_figures': 0,
+        'canvas_bytes': canvas_bytes,
+        'n_created': 0,
+        'n_reused': 0,
+        'n_closed': 0,
+    }
+    for scope in _active_scopes:
+        stats['n_pooled_figures'] += scope.get_n_pooled()
+        stats['n_created'] += scope.n_created
+        stats['n_reused'] += scope.n_reused
+        stats['n_closed'] += scope.n_closed
+    return stats
+
+
+def _get_canvas_bytes(fig: matplotlib.figure.Figure) -> int:
+    renderer = getattr(fig.canvas, 'renderer', None)
+    if renderer is None:
+        return 0
+    return int(renderer.width) * int(renderer.height) * 4
+
+
+def _get_pool_key(kwargs: typing.Mapping[str, typing.Any]) -> typing.Hashable:
+    """figures can only be reused for identical figure kwargs"""
+    if 'num' in kwargs:
+        return None
+    items = []
+    for key, value in sorted(kwargs.items()):
+        if isinstance(value, list):
+            value = tuple(value)
+        try:
+            hash(value)
+        except TypeError:
+            return None
+        items.append((key, value))
+    return tuple(items)
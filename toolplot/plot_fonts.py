@@ -1,2 +1,188 @@
 # to show all available fonts see http://jonathansoma.com/lede/data-studio/matplotlib/list-all-fonts-available-in-matplotlib-plus-samples/
+"""resolve configured font families once and pin them in rcParams
 
+matplotlib resolves font.family on every text artist. families that do not
+match a font name exactly, such as 'Monospace', go through a scored scan of
+every installed font, and a warning if nothing matches. preflight_fonts()
+resolves each family once and replaces the families in rcParams with the
+exact names of resolved fonts. resolved font paths are cached on disk only
+if font_cache_path is set, e.g. to get_font_cache_path()
+"""
+
+from __future__ import annotations
+
+import contextlib
+import typing
+
+from typing_extensions import TypedDict
+
+
+class ResolvedFont(TypedDict):
+    family: str
+    name: str
+    path: str
+
+
+class FontLookupCounts(TypedDict):
+    n_lookups: int
+    n_scans: int
+
+
+# file used by preflight_fonts() to cache resolved fonts across sessions,
+# None resolves fonts in every session without writing any file
+font_cache_path: str | None = None
+
+
+def get_font_cache_path() -> str:
+    """get default font cache location, under XDG_CACHE_HOME or ~/.cache"""
+    import os
+
+    cache_dir = os.environ.get('XDG_CACHE_HOME', os.path.expanduser('~/.cache'))
+    return os.path.join(cache_dir, 'toolplot', 'fonts.json')
+
+
+def preflight_fonts(
+    families: typing.Sequence[str] | None = None,
+    *,
+    cache_path: str | None = None,
+    pin: bool = True,
+) -> list[ResolvedFont]:
+    """resolve font families, using and updating the persistent font cache
+
+    families default to rcParams['font.family']. cache_path defaults to
+    font_cache_path, and without either no cache is read or written. with
+    pin=True, font.family is set to the exact names of the resolved fonts
+    """
+    import matplotlib
+
+    if families is None:
+        families = list(matplotlib.rcParams['font.family'])
+    if cache_path is None:
+        cache_path = font_cache_path
+
+    if cache_path is not None:
+        cache = _load_font_cache(cache_path)
+    else:
+        cache = {}
+    cache_key = _get_cache_key()
+    cached = cache.get(cache_key, {})
+
+    resolved = []
+    modified = False
+    for family in families:
+        font = cached.get(family)
+        if font is None or not _font_exists(font['path']):
+            font = resolve_font(family)
+            cached[family] = font
+            modified = True
+        resolved.append(font)
+
+    if modified and cache_path is not None:
+        cache[cache_key] = cached
+        _save_font_cache(cache_path, cache)
+
+    if pin:
+        names = []
+        for font in resolved:
+            if font['name'] not in names:
+                names.append(font['name'])
+        matplotlib.rcParams['font.family'] = names
+
+    return resolved
+
+
+def resolve_font(family: str) -> ResolvedFont:
+    """resolve font family to a font file, as matplotlib would"""
+    import matplotlib.font_manager as font_manager
+
+    properties = font_manager.FontProperties(family=family)
+    path = font_manager.fontManager.findfont(properties)
+    name = font_manager.FontProperties(fname=path).get_name()
+    return {'family': family, 'name': name, 'path': path}
+
+
+@contextlib.contextmanager
+def count_font_lookups() -> typing.Iterator[FontLookupCounts]:
+    """count font lookups made inside block, e.g. by a draw or savefig
+
+    n_lookups counts every findfont() call, n_scans counts the calls that
+    missed matplotlib's lookup cache and scanned the installed fonts
+    """
+    import matplotlib.font_manager as font_manager
+
+    manager = font_manager.fontManager
+    counts: FontLookupCounts = {'n_lookups': 0, 'n_scans': 0}
+    findfont = manager.findfont
+    # restore what was there before, which may be another counter's wrapper
+    previous = vars(manager).get('findfont')
+
+    def counting_findfont(*args: typing.Any, **kwargs: typing.Any) -> str:
+        counts['n_lookups'] += 1
+        return findfont(*args, **kwargs)
+
+    n_misses = _get_lookup_cache_misses()
+    manager.findfont = counting_findfont  # type: ignore
+    try:
+        yield counts
+    finally:
+        if previous is not None:
+            manager.findfont = previous  # type: ignore
+        else:
+            del manager.findfont
+        counts['n_scans'] = _get_lookup_cache_misses() - n_misses
+
+
+def _get_lookup_cache_misses() -> int:
+    import matplotlib.font_manager as font_manager
+
+    cached = getattr(font_manager.FontManager, '_findfont_cached', None)
+    if cached is None or not hasattr(cached, 'cache_info'):
+        return 0
+    misses: int = cached.cache_info().misses
+    return misses
+
+
+def _get_cache_key() -> str:
+    """cached paths are only valid for the same matplotlib and font list"""
+    import hashlib
+
+    import matplotlib
+    import matplotlib.font_manager as font_manager
+
+    paths = sorted({font.fname for font in font_manager.fontManager.ttflist})
+    digest = hashlib.sha256('\n'.join(paths).encode()).hexdigest()[:16]
+    return matplotlib.__version__ + '__' + digest
+
+
+def _font_exists(path: str) -> bool:
+    import os
+
+    return os.path.isfile(path)
+
+
+def _load_font_cache(path: str) -> dict[str, dict[str, ResolvedFont]]:
+    import json
+
+    try:
+        with open(path) as f:
+            cache: dict[str, dict[str, ResolvedFont]] = json.load(f)
+        return cache
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_font_cache(
+    path: str, cache: dict[str, dict[str, ResolvedFont]]
+) -> None:
+    import json
+    import os
+
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(cache, f, indent=2)
+        os.replace(tmp_path, path)
+    except OSError:
+        # a read-only cache dir only costs a re-resolve next time
+        pass
@@ -0,0 +1,198 @@
+from __future__ import annotations
+
+import contextlib
+import time
+import typing
+
+from typing_extensions import TypedDict
+
+
+class StageRecord(TypedDict):
+    stage: str
+    label: str | None
+    depth: int
+    start: float
+    seconds: float
+    n_rows: int | None
+    n_points: int | None
+
+
+class StageTotal(TypedDict):
+    stage: str
+    n_calls: int
+    seconds: float
+    n_rows: int
+    n_points: int
+
+
+class ProfileReport(TypedDict):
+    stages: list[StageRecord]
+    totals: dict[str, StageTotal]
+    seconds: float
+
+
+StageCallback = typing.Callable[[StageRecord], None]
+
+
+class _ActiveProfile(TypedDict):
+    report: ProfileReport
+    callback: StageCallback | None
+    t_start: float
+    depth: int
+
+
+_active_profiles: list[_ActiveProfile] = []
+
+
+def is_profiling() -> bool:
+    """return whether any stage profile is currently active"""
+    return len(_active_profiles) > 0
+
+
+@contextlib.contextmanager
+def profile_stages(
+    callback: StageCallback | None = None,
+) -> typing.Iterator[ProfileReport]:
+    """record per-stage wall time of plotting functions called inside block
+
+    the yielded report is filled in as stages complete, totals are computed
+    when the block exits. if callback is given, it is called with each
+    StageRecord as soon as that stage finishes
+    """
+    report: ProfileReport = {'stages': [], 'totals': {}, 'seconds': 0.0}
+    profile: _ActiveProfile = {
+        'report': report,
+        'callback': callback,
+        't_start': time.perf_counter(),
+        'depth': 0,
+    }
+    _active_profiles.append(profile)
+    try:
+        yield report
+    finally:
+        _active_profiles.remove(profile)
+        report['seconds'] = time.perf_counter() - profile['t_start']
+        report['totals'] = summarize_stages(report['stages'])
+
+
+@contextlib.contextmanager
+def _stage(
+    stage: str,
+    *,
+    label: str | None = None,
+    n_rows: int | None = None,
+    n_points: int | None = None,
+) -> typing.Iterator[dict[str, typing.Any]]:
+    """time a stage for every active profile
+
+    yields a mutable dict so that n_rows / n_points can be filled in after
+    they become known inside the block
+    """
+    counts: dict[str, typing.Any] = {'n_rows': n_rows, 'n_points': n_points}
+    if len(_active_profiles) == 0:
+        yield counts
+        return
+
+    profiles = list(_active_profiles)
+    depths = [profile['depth'] for profile in profiles]
+    for profile in profiles:
+        profile['depth'] += 1
+    t_start = time.perf_counter()
+    try:
+        yield counts
+    finally:
+        t_end = time.perf_counter()
+        for profile, depth in zip(profiles, depths):
+            profile['depth'] = depth
+            record: StageRecord = {
+                'stage': stage,
+                'label': label,
+                'depth': depth,
+                'start': t_start - profile['t_start'],
+                'seconds': t_end - t_start,
+                'n_rows': counts['n_rows'],
+                'n_points': counts['n_points'],
+            }
+            profile['report']['stages'].append(record)
+            if profile['callback'] is not None:
+                profile['callback'](record)
+
+
+def _record_stage(
+    stage: str,
+    *,
+    t_start: float,
+    seconds: float,
+    label: str | None = None,
+) -> None:
+    """record a stage timed by the caller, for every active profile
+
+    for stages that cannot be wrapped in _stage(), e.g. parts of one call
+    """
+    for profile in _active_profiles:
+        record: StageRecord = {
+            'stage': stage,
+            'label': label,
+            'depth': profile['depth'],
+            'start': t_start - profile['t_start'],
+            'seconds': seconds,
+            'n_rows': None,
+            'n_points': None,
+        }
+        profile['report']['stages'].append(record)
+        if profile['callback'] is not None:
+            profile['callback'](record)
+
+
+def summarize_stages(stages: list[StageRecord]) -> dict[str, StageTotal]:
+    """aggregate stage records by stage name, in order of first occurrence"""
+    totals: dict[str, StageTotal] = {}
+    for record in stages:
+        total = totals.get(record['stage'])
+        if total is None:
+            total = {
+                'stage': record['stage'],
+                'n_calls': 0,
+                'seconds': 0.0,
+                'n_rows': 0,
+                'n_points': 0,
+            }
+            totals[record['stage']] = total
+        total['n_calls'] += 1
+        total['seconds'] += record['seconds']
+        if record['n_rows'] is not None:
+            total['n_rows'] += record['n_rows']
+        if record['n_points'] is not None:
+            total['n_points'] += record['n_points']
+    return totals
+
+
+def print_profile_report(report: ProfileReport) -> None:
+    """print stage totals of a profile report as a table"""
+    import toolstr
+
+    rows = []
+    for total in report['totals'].values():
+        if report['seconds'] > 0:
+            share = total['seconds'] / report['seconds']
+        else:
+            share = 0
+        rows.append(
+            [
+                total['stage'],
+                total['n_calls'],
+                total['seconds'],
+                share,
+                total['n_rows'],
+                total['n_points'],
+            ]
+        )
+    toolstr.print_table(
+        rows,
+        labels=['stage', 'calls', 'seconds', 'share', 'rows', 'points'],
+        column_formats={
+            'seconds': {'decimals': 4},
+            'share': {'percentage': True, 'decimals': 1},
+        },
+    )
+    print('total:', toolstr.format(report['seconds'], decimals=4), 'seconds')
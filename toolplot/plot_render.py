@@ -0,0 +1,311 @@
+"""render plot specs stored in json / toml files
+
+a spec file contains either
+- a `plot_data` table, a PlotData spec rendered with plot_subplots
+- a `plot_groups` table, kwargs of plot_groups, with `data` as a file path
+  or as an inline mapping of column name to values. only plot_groups_kwargs
+  are accepted, output kwargs like html_path are rejected
+
+optional top-level keys are `name` (output file name, default file stem) and
+`formats` (default output formats)
+
+data files are referenced relative to the spec file. in PlotData specs any
+'Series' value can be a series reference, see plot_series
+"""
+
+from __future__ import annotations
+
+import os
+import typing
+
+from . import plot_series
+
+if typing.TYPE_CHECKING:
+    import polars as pl
+
+
+spec_formats = {
+    'plot_data': ['png', 'svg', 'pdf'],
+    'plot_groups': ['html', 'png', 'svg'],
+}
+
+# plot_groups kwargs a spec may set, outputs are returned rather than written
+plot_groups_kwargs = {
+    'data',
+    'mode',
+    'group_column',
+    'groups',
+    'n_groups',
+    'colors',
+    'metric_column',
+    'metric_name',
+    'metric_format',
+    'title',
+    'xlim',
+    'ylim',
+    'include_total',
+    'total_visible',
+    'set_ylim',
+    'xaxis_hoverformat',
+    'bar_outline_width',
+    'bar_gap',
+    'bar_x_center',
+    'rangeslider',
+    'rangeslider_max_points',
+    'validation',
+    'quantiles',
+    'quantile_error',
+    'transform',
+    'window',
+}
+
+
+def load_spec_file(path: str) -> dict[str, typing.Any]:
+    """load plot spec from json or toml file"""
+    if path.endswith('.json'):
+        import json
+
+        with open(path, 'r') as f:
+            spec: dict[str, typing.Any] = json.load(f)
+    elif path.endswith('.toml'):
+        try:
+            import tomllib  # type: ignore
+        except ImportError:
+            try:
+                import tomli as tomllib  # type: ignore
+            except ImportError:
+                raise Exception('toml specs require python>=3.11 or tomli')
+        with open(path, 'rb') as f:
+            spec = tomllib.load(f)
+    else:
+        raise Exception('unknown spec file extension: ' + str(path))
+
+    spec.setdefault('name', os.path.splitext(os.path.basename(path))[0])
+    return spec
+
+
+def get_spec_kind(spec: typing.Mapping[str, typing.Any]) -> str:
+    """return which renderer a spec targets"""
+    if 'plot_data' in spec and 'plot_groups' not in spec:
+        return 'plot_data'
+    elif 'plot_groups' in spec and 'plot_data' not in spec:
+        return 'plot_groups'
+    else:
+        raise Exception(
+            'spec must contain exactly one of plot_data, plot_groups'
+        )
+
+
+def get_spec_dependencies(
+    spec: typing.Mapping[str, typing.Any], base_dir: str
+) -> list[str]:
+    """return paths of all data files referenced by spec"""
+    paths: list[str] = []
+    if get_spec_kind(spec) == 'plot_groups':
+        data = spec['plot_groups'].get('data')
+        if isinstance(data, str):
+            paths.append(os.path.join(base_dir, data))
+    else:
+        for reference in _iterate_series_references(spec['plot_data']):
+            paths.append(os.path.join(base_dir, reference['path']))
+    return sorted(set(paths))
+
+
+def check_spec(spec: typing.Mapping[str, typing.Any], base_dir: str) -> None:
+    """check that spec only sets known kwargs and reads files in base_dir
+
+    paths are resolved with symlinks, so neither absolute paths, '..', nor
+    links can reach files outside of base_dir
+    """
+    if get_spec_kind(spec) == 'plot_groups':
+        _check_plot_groups_kwargs(spec['plot_groups'])
+    real_base_dir = os.path.realpath(base_dir)
+    for path in get_spec_dependencies(spec, base_dir):
+        real_path = os.path.realpath(path)
+        if os.path.commonpath([real_base_dir, real_path]) != real_base_dir:
+            raise Exception('spec references file outside of base_dir')
+
+
+def get_spec_formats(
+    spec: typing.Mapping[str, typing.Any],
+    formats: typing.Sequence[str] | None = None,
+) -> typing.Sequence[str]:
+    """return output formats of spec, checking that its renderer has them"""
+    kind = get_spec_kind(spec)
+    if formats is None:
+        formats = spec.get('formats', spec_formats[kind][:1])
+    for format in formats:
+        if format not in spec_formats[kind]:
+            raise Exception(
+                'format ' + str(format) + ' not supported for ' + kind
+            )
+    return formats
+
+
+def render_spec(
+    spec: typing.Mapping[str, typing.Any],
+    formats: typing.Sequence[str] | None = None,
+    *,
+    base_dir: str = '.',
+) -> dict[str, bytes]:
+    """render spec to bytes of each output format"""
+    kind = get_spec_kind(spec)
+    formats = get_spec_formats(spec, formats)
+    if kind == 'plot_data':
+        return _render_plot_data(spec['plot_data'], formats, base_dir)
+    else:
+        return _render_plot_groups(spec['plot_groups'], formats, base_dir)
+
+
+def render_spec_file(
+    path: str,
+    output_dir: str | None = None,
+    formats: typing.Sequence[str] | None = None,
+) -> list[str]:
+    """render spec file, writing one output file per format"""
+    spec = load_spec_file(path)
+    base_dir = os.path.dirname(os.path.abspath(path))
+    if output_dir is None:
+        output_dir = base_dir
+    outputs = render_spec(spec, formats, base_dir=base_dir)
+
+    os.makedirs(output_dir, exist_ok=True)
+    output_paths = []
+    for format, content in outputs.items():
+        output_path = os.path.join(output_dir, spec['name'] + '.' + format)
+        with open(output_path, 'wb') as f:
+            f.write(content)
+        output_paths.append(output_path)
+    return output_paths
+
+
+def _warm_worker(setup_formatting: bool = False) -> None:
+    """import plotting backends up front so that renders start warm"""
+    import matplotlib
+
+    matplotlib.use('Agg')
+
+    import matplotlib.font_manager
+    import matplotlib.pyplot as plt
+    import plotly.graph_objects as go  # type: ignore
+    import polars as pl
+
+    from . import plot_create
+    from .special_plots import group_plots
+
+    # font cache is loaded lazily on first access
+    matplotlib.font_manager.fontManager.get_default_size()
+
+    if setup_formatting:
+        from . import plot_setup
+
+        plot_setup.setup_plot_formatting()
+
+
+def _render_plot_data(
+    plot_data: typing.Mapping[str, typing.Any],
+    formats: typing.Sequence[str],
+    base_dir: str,
+) -> dict[str, bytes]:
+    import io
+    import matplotlib.pyplot as plt
+
+    from . import plot_create
+
+    plot_data = _rebase_series_references(plot_data, base_dir)
+    plot_create.plot_subplots(plot_data)
+    fig = plt.gcf()
+    try:
+        outputs = {}
+        for format in formats:
+            buffer = io.BytesIO()
+            fig.savefig(buffer, format=format, bbox_inches='tight')
+            outputs[format] = buffer.getvalue()
+    finally:
+        plt.close(fig)
+    return outputs
+
+
+def _render_plot_groups(
+    kwargs: typing.Mapping[str, typing.Any],
+    formats: typing.Sequence[str],
+    base_dir: str,
+) -> dict[str, bytes]:
+    import plotly.io as pio  # type: ignore
+
+    from .special_plots import group_plots
+
+    _check_plot_groups_kwargs(kwargs)
+    kwargs = dict(kwargs)
+    if isinstance(kwargs.get('data'), str):
+        path = os.path.join(base_dir, kwargs['data'])
+        kwargs['data'] = plot_series.read_data_file(path)
+    elif isinstance(kwargs.get('data'), dict):
+        kwargs['data'] = _create_inline_frame(kwargs['data'])
+    kwargs['show'] = False
+    fig = group_plots.plot_groups(**kwargs)
+
+    # figures of validation 'trusted' are plain dicts
+    outputs = {}
+    for format in formats:
+        if format == 'html':
+            html = pio.to_html(
+                fig, config={'displayModeBar': False}, validate=False
+            )
+            outputs[format] = html.encode()
+        else:
+            outputs[format] = pio.to_image(
+                fig,
+                format=format,
+                scale=4,
+                height=600,
+                width=1000,
+                validate=False,
+            )
+    return outputs
+
+
+def _check_plot_groups_kwargs(kwargs: typing.Mapping[str, typing.Any]) -> None:
+    unknown = sorted(set(kwargs) - plot_groups_kwargs)
+    if len(unknown) > 0:
+        raise Exception('unsupported plot_groups kwargs: ' + ', '.join(unknown))
+
+
+def _create_inline_frame(columns: dict[str, typing.Any]) -> pl.DataFrame:
+    """build frame from json columns, parsing timestamp strings"""
+    import polars as pl
+
+    data = pl.DataFrame(columns)
+    if data.schema.get('timestamp') == pl.String:
+        data = data.with_columns(pl.col.timestamp.str.to_datetime())
+    return data
+
+
+def _iterate_series_references(
+    value: typing.Any,
+) -> typing.Iterator[dict[str, typing.Any]]:
+    if plot_series.is_series_reference(value):
+        yield value
+    elif isinstance(value, dict):
+        for subvalue in value.values():
+            yield from _iterate_series_references(subvalue)
+    elif isinstance(value, list):
+        for subvalue in value:
+            yield from _iterate_series_references(subvalue)
+
+
+def _rebase_series_references(value: typing.Any, base_dir: str) -> typing.Any:
+    """make series reference paths relative to the spec file directory"""
+    if plot_series.is_series_reference(value):
+        return dict(value, path=os.path.join(base_dir, value['path']))
+    elif isinstance(value, dict):
+        return {
+            key: _rebase_series_references(subvalue, base_dir)
+            for key, subvalue in value.items()
+        }
+    elif isinstance(value, list):
+        return [
+            _rebase_series_references(subvalue, base_dir) for subvalue in value
+        ]
+    else:
+        return value
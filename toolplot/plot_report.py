@@ -0,0 +1,83 @@
+"""multi-page pdf reports of many PlotData specs
+
+pages are streamed into a single pdf. each figure is rendered, written as a
+page, and freed before the next one, so memory is bounded by one page.
+
+pages are rendered in the writing process. building a figure's artists is
+cheap next to drawing and pdf encoding, which happen inside the pdf writer
+and so cannot be moved to worker processes
+"""
+
+from __future__ import annotations
+
+import typing
+
+if typing.TYPE_CHECKING:
+    import matplotlib.figure
+
+
+def write_pdf_report(
+    path: str,
+    plot_datas: typing.Iterable[typing.Mapping[str, typing.Any]],
+    *,
+    setup_formatting: bool = False,
+    metadata: dict[str, typing.Any] | None = None,
+    verbose: bool = True,
+    **savefig_kwargs: typing.Any,
+) -> int:
+    """write one pdf page per PlotData, returning the number of pages
+
+    plot_datas can be a generator, specs are consumed as pages are written.
+    setup_formatting applies setup_plot_formatting() before rendering
+    """
+    import time
+
+    from matplotlib.backends.backend_pdf import PdfPages
+
+    from . import plot_save
+
+    if metadata is None:
+        metadata = {}
+    metadata = dict(plot_save.reproducible_metadata['pdf'], **metadata)
+    if setup_formatting:
+        from . import plot_setup
+
+        plot_setup.setup_plot_formatting()
+
+    t_start = time.time()
+    n_pages = 0
+    with PdfPages(path, metadata=metadata) as pdf:
+        for fig in _iterate_figures(plot_datas):
+            pdf.savefig(fig, **savefig_kwargs)
+            n_pages += 1
+
+    if verbose:
+        print(
+            'wrote',
+            n_pages,
+            'pages to',
+            path,
+            'in',
+            '%.2f' % (time.time() - t_start),
+            'seconds',
+        )
+    return n_pages
+
+
+def _iterate_figures(
+    plot_datas: typing.Iterable[typing.Mapping[str, typing.Any]],
+) -> typing.Iterator[matplotlib.figure.Figure]:
+    """yield figure of each PlotData in order, freeing it once consumed"""
+    from . import plot_create
+    from . import plot_figures
+    from . import plot_profile
+
+    # consecutive pages of the same size reuse one canvas
+    with plot_figures.managed_figures(pool_size=1):
+        for p, plot_data in enumerate(plot_datas):
+            with plot_profile._stage('render_page', label=str(p)):
+                fig = plot_create.plot_subplots(plot_data)
+            try:
+                yield fig
+            finally:
+                plot_figures.release_figure(fig)
@@ -1,8 +1,29 @@
+from __future__ import annotations
+
 import os
-import shutil
+import typing
 
 import matplotlib.pyplot as plt
-import tooltime
+
+from . import plot_archive
+from . import plot_figures
+from . import plot_profile
+
+if typing.TYPE_CHECKING:
+    from matplotlib.artist import Artist
+    from matplotlib.axes import Axes
+    from matplotlib.figure import Figure
+    from matplotlib.lines import Line2D
+
+    Rasterization = tuple[typing.Union[Artist, '_PatchRasterization'], bool]
+
+
+vector_formats = ['svg', 'pdf', 'eps', 'ps']
+
+reproducible_metadata = {
+    'pdf': {'CreationDate': None},
+    'svg': {'Date': None},
+}
 
 
 def save_figure(
@@ -14,12 +35,20 @@ def save_figure(
     png=None,
     svg=None,
     verbose=True,
+    rasterize=None,
+    rasterize_dpi=300,
 ):
     """save figure to mutiple formats and optionally archive at each save
 
     specify one of
     - {name, figure_dir}
     - {path}
+
+    inside managed_figures(), the figure is closed or recycled after saving
+
+    with rasterize=n, vector formats (svg, pdf, eps) rasterize each artist
+    with more than n vertices or elements at rasterize_dpi, while text, axes,
+    and ticks stay vectors
     """
 
     # compute output formats
@@ -47,18 +76,213 @@ def save_figure(
     # gather kwargs
     save_kwargs = {'bbox_inches': 'tight'}
 
+    fig = plt.gcf()
+
+    # rasterize heavy artists in vector formats
+    if rasterize is not None and any(f in vector_formats for f in paths):
+        rasterized = rasterize_heavy_artists(fig, rasterize)
+    else:
+        rasterized = []
+
     # save figure to each format
-    for path in paths.values():
+    for format, path in paths.items():
         os.makedirs(os.path.dirname(path), exist_ok=True)
         if verbose:
-            print('saving figure ' + name + ':', path)
-        plt.savefig(path, **save_kwargs)
+            print('saving figure ' + str(name or '') + ':', path)
+        format_kwargs: dict[str, typing.Any] = dict(save_kwargs)
+        rc: dict[typing.Any, typing.Any] = {}
+        if historical_dir is not None:
+            # omit dates and random ids so unchanged figures archive once
+            format_kwargs['metadata'] = reproducible_metadata.get(format)
+            rc['svg.hashsalt'] = 'toolplot'
+        if format in vector_formats and len(rasterized) > 0:
+            format_kwargs['dpi'] = rasterize_dpi
+        with plt.rc_context(rc):
+            if plot_profile.is_profiling():
+                _save_profiled(fig, path, format, format_kwargs)
+            else:
+                fig.savefig(path, **format_kwargs)
+        if verbose and format in vector_formats and len(rasterized) > 0:
+            _print_rasterization(rasterized, format, path)
 
-    # copy to historical dir
+    for artist, previous in rasterized:
+        artist.set_rasterized(previous)
+
+    # archive in historical dir, storing each distinct file content once
     if historical_dir is not None:
-        timestamp = tooltime.create_timestamp_label()
-        historical_name = timestamp + '__' + name + '.'
-        for format in formats:
-            path = os.path.join(figure_dir, format, historical_name + format)
-            os.makedirs(os.path.dirname(path), exist_ok=True)
-            shutil.copy(paths[format], path)
+        if name is None:
+            name = os.path.basename(head)
+        plot_archive.archive_figure(historical_dir, name, paths)
+
+    plot_figures.release_figure(fig)
+
+
+def rasterize_heavy_artists(fig: Figure, threshold: int) -> list[Rasterization]:
+    """mark artists with more than threshold vertices or elements rasterized
+
+    returns list of (artist, previous rasterized setting) for restoring
+    """
+    import matplotlib.collections
+    import matplotlib.lines
+
+    rasterized: list[Rasterization] = []
+    for ax in fig.axes:
+        for artist in ax.get_children():
+            if isinstance(
+                artist,
+                (matplotlib.lines.Line2D, matplotlib.collections.Collection),
+            ):
+                if count_elements(artist) > threshold:
+                    rasterized.append((artist, artist.get_rasterized()))
+
+        # many small patches, e.g. histogram bars, are rasterized together
+        # by rasterizing every artist below them, if the axis is above them
+        patches = [patch for patch in ax.patches if patch.get_visible()]
+        if len(patches) > threshold and ax.get_rasterization_zorder() is None:
+            zorder = max(patch.get_zorder() for patch in patches) + 0.01
+            axis_zorder = min(ax.xaxis.get_zorder(), ax.yaxis.get_zorder())
+            if zorder <= axis_zorder:
+                rasterized.append((_PatchRasterization(ax, zorder), False))
+
+    for item, _ in rasterized:
+        item.set_rasterized(True)
+    return rasterized
+
+
+def count_elements(artist: Artist) -> int:
+    """count vertices of line, or markers or vertices of collection"""
+    import matplotlib.collections
+    import matplotlib.lines
+    import numpy as np
+
+    if isinstance(artist, matplotlib.lines.Line2D):
+        return len(np.asarray(artist.get_xydata()))
+    elif isinstance(artist, matplotlib.collections.QuadMesh):
+        return int(np.size(artist.get_coordinates())) // 2
+    elif isinstance(artist, matplotlib.collections.Collection):
+        n_offsets = len(np.asarray(artist.get_offsets()))
+        if n_offsets > 1:
+            return n_offsets
+        return sum(
+            len(np.asarray(path.vertices)) for path in artist.get_paths()
+        )
+    else:
+        return 0
+
+
+class _PatchRasterization:
+    """rasterizes the patches of an axes through its rasterization zorder"""
+
+    def __init__(self, ax: Axes, zorder: float) -> None:
+        self.ax = ax
+        self.zorder = zorder
+
+    def set_rasterized(self, rasterized: bool) -> None:
+        if rasterized:
+            self.ax.set_rasterization_zorder(self.zorder)
+        else:
+            self.ax.set_rasterization_zorder(None)
+
+
+def _save_profiled(
+    fig: Figure, path: str, format: str, kwargs: dict[str, typing.Any]
+) -> None:
+    """savefig, reporting time in Figure.draw as 'draw' and the rest as
+    'encode'
+
+    savefig draws the figure itself, twice with bbox_inches='tight', so the
+    draws are timed inside it rather than by drawing up front
+    """
+    import time
+
+    draw = fig.draw
+    draw_seconds = []
+
+    def timed_draw(renderer: typing.Any) -> None:
+        t_draw = time.perf_counter()
+        try:
+            draw(renderer)
+        finally:
+            draw_seconds.append(time.perf_counter() - t_draw)
+
+    # shadow the method on this instance only while saving
+    instance: typing.Any = fig
+    t_start = time.perf_counter()
+    instance.draw = timed_draw
+    try:
+        fig.savefig(path, **kwargs)
+    finally:
+        del instance.draw
+    seconds = time.perf_counter() - t_start
+    plot_profile._record_stage(
+        'draw', t_start=t_start, seconds=sum(draw_seconds), label=format
+    )
+    plot_profile._record_stage(
+        'encode',
+        t_start=t_start,
+        seconds=seconds - sum(draw_seconds),
+        label=format,
+    )
+
+
+def _print_rasterization(
+    rasterized: list[Rasterization], format: str, path: str
+) -> None:
+    import matplotlib.collections
+    import matplotlib.lines
+    import numpy as np
+
+    vector_bytes = 0
+    for artist, _ in rasterized:
+        if isinstance(artist, _PatchRasterization):
+            description = 'patches'
+            n_elements = len(artist.ax.patches)
+            n_written = n_elements
+            kind = 'patch'
+        else:
+            description = type(artist).__name__
+            label = artist.get_label()
+            if isinstance(label, str) and label and not label.startswith('_'):
+                description += ' ' + repr(label)
+            n_elements = count_elements(artist)
+            if isinstance(artist, matplotlib.lines.Line2D):
+                # vector backends simplify lines before writing them
+                n_written = _count_written_vertices(artist)
+                kind = 'vertex'
+            elif (
+                isinstance(artist, matplotlib.collections.Collection)
+                and len(np.asarray(artist.get_offsets())) > 1
+            ):
+                n_written = n_elements
+                kind = 'marker'
+            else:
+                n_written = n_elements
+                kind = 'vertex'
+        vector_bytes += n_written * element_bytes[format][kind]
+        print('    rasterized', description + ',', n_elements, 'elements')
+
+    print(
+        '    rasterized '
+        + str(len(rasterized))
+        + ' artists, saving ~%.1f MB of vectors,' % (vector_bytes / 1e6)
+        + ' wrote %.1f MB' % (os.path.getsize(path) / 1e6)
+    )
+
+
+def _count_written_vertices(line: Line2D) -> int:
+    import numpy as np
+
+    path = line.get_path()
+    transform = line.get_transform()
+    cleaned = path.cleaned(transform=transform, simplify=True)
+    return len(np.asarray(cleaned.vertices))
+
+
+# approximate encoded bytes of one line vertex, marker, or bar patch, as
+# measured with matplotlib's default styles
+element_bytes = {
+    'svg': {'vertex': 25, 'marker': 107, 'patch': 192},
+    'pdf': {'vertex': 11, 'marker': 16, 'patch': 24},
+    'eps': {'vertex': 24, 'marker': 19, 'patch': 168},
+    'ps': {'vertex': 24, 'marker': 19, 'patch': 168},
+}
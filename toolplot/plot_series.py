@@ -0,0 +1,108 @@
+"""series references let PlotData specs point at data instead of holding it
+
+a reference is a mapping {'path': ..., 'column': ..., 'slice': [start, stop]}
+where slice is optional. Arrow IPC files are memory-mapped and Parquet files
+only read the requested column and row groups. referenced data is loaded
+when the subplot is drawn, so specs stay small and picklable
+"""
+
+from __future__ import annotations
+
+import os
+import typing
+
+if typing.TYPE_CHECKING:
+    import polars as pl
+
+    from typing_extensions import TypedDict
+
+    class SeriesReference(TypedDict, total=False):
+        path: str
+        column: str
+        slice: typing.Sequence[int | None]
+        format: typing.Literal['parquet', 'ipc']
+
+
+data_extensions = {
+    '.parquet': 'parquet',
+    '.pq': 'parquet',
+    '.arrow': 'ipc',
+    '.ipc': 'ipc',
+    '.feather': 'ipc',
+}
+
+
+def is_series_reference(value: typing.Any) -> bool:
+    """return whether value is a series reference rather than series data"""
+    return isinstance(value, dict) and 'path' in value and 'column' in value
+
+
+def load_series(value: typing.Any) -> typing.Any:
+    """load referenced series as a numpy array, pass other values through"""
+    if not is_series_reference(value):
+        return value
+    lazy = _scan_reference(value).select(value['column'])
+    offset, length = _get_slice(value)
+    if offset != 0 or length is not None:
+        lazy = lazy.slice(offset, length)
+    return lazy.collect()[value['column']].to_numpy()
+
+
+def get_series_length(value: typing.Any) -> int:
+    """get length of series or referenced series without loading its data"""
+    import polars as pl
+
+    if not is_series_reference(value):
+        return len(value)
+    offset, length = _get_slice(value)
+    if length is not None:
+        return length
+    n_rows: int = _scan_reference(value).select(pl.len()).collect().item()
+    return max(n_rows - offset, 0)
+
+
+def read_data_file(
+    path: str,
+    columns: typing.Sequence[str] | None = None,
+    format: typing.Literal['parquet', 'ipc'] | None = None,
+) -> pl.DataFrame:
+    """read Parquet or Arrow IPC file, inferring format from extension"""
+    lazy = _scan_file(path, format)
+    if columns is not None:
+        lazy = lazy.select(columns)
+    return lazy.collect()
+
+
+def _scan_reference(reference: SeriesReference) -> pl.LazyFrame:
+    return _scan_file(reference['path'], reference.get('format'))
+
+
+def _scan_file(
+    path: str, format: typing.Literal['parquet', 'ipc'] | None = None
+) -> pl.LazyFrame:
+    import polars as pl
+
+    if format is None:
+        extension = os.path.splitext(path)[1].lower()
+        format = data_extensions.get(extension)  # type: ignore
+    if format == 'parquet':
+        return pl.scan_parquet(path)
+    elif format == 'ipc':
+        return pl.scan_ipc(path)
+    else:
+        raise Exception('unknown data file format: ' + str(path))
+
+
+def _get_slice(reference: SeriesReference) -> tuple[int, int | None]:
+    """convert slice of reference into (offset, length)"""
+    row_slice = reference.get('slice')
+    if row_slice is None:
+        return 0, None
+    start, stop = row_slice
+    if start is None:
+        start = 0
+    if start < 0 or (stop is not None and stop < 0):
+        raise Exception('negative slice bounds not supported')
+    if stop is None:
+        return start, None
+    return start, max(stop - start, 0)
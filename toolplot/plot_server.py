@@ -0,0 +1,301 @@
+"""local render server with a pool of pre-warmed worker processes
+
+endpoints
+- POST /render?format=png    body is a json spec, see plot_render
+- GET /metrics               request counts and latency percentiles
+- GET /health
+
+/render answers 400 for malformed specs, 500 for failed renders, 503 when
+max_queue renders are pending, and 504 when a render exceeds the timeout.
+a timed out render still holds its queue slot until its worker finishes
+
+plot_groups specs can give `data` as a Parquet/Arrow path relative to the
+server's base_dir, or inline as a json mapping of column name to values.
+specs that read files outside of base_dir or set output kwargs such as
+html_path are answered with 400, see plot_render.check_spec
+"""
+
+from __future__ import annotations
+
+import http.server
+import socketserver
+import threading
+import time
+import typing
+
+if typing.TYPE_CHECKING:
+    import concurrent.futures
+
+    from typing_extensions import TypedDict
+
+    class ServerMetrics(TypedDict):
+        n_requests: int
+        n_completed: int
+        n_failed: int
+        n_timeouts: int
+        n_rejected: int
+        n_queued: int
+        latency: dict[str, dict[str, float | None]]
+
+
+content_types = {
+    'png': 'image/png',
+    'svg': 'image/svg+xml',
+    'pdf': 'application/pdf',
+    'html': 'text/html; charset=utf-8',
+}
+
+n_latency_samples = 10000
+
+
+def serve(
+    *,
+    host: str = '127.0.0.1',
+    port: int = 8765,
+    socket_path: str | None = None,
+    n_workers: int | None = None,
+    timeout: float = 60,
+    max_queue: int = 64,
+    base_dir: str = '.',
+    setup_formatting: bool = False,
+    verbose: bool = True,
+) -> None:
+    """serve render requests until interrupted
+
+    binds to host:port, or to a unix socket if socket_path is given
+    """
+    server = create_server(
+        host=host,
+        port=port,
+        socket_path=socket_path,
+        n_workers=n_workers,
+        timeout=timeout,
+        max_queue=max_queue,
+        base_dir=base_dir,
+        setup_formatting=setup_formatting,
+        verbose=verbose,
+    )
+    if verbose:
+        if socket_path is not None:
+            print('serving on unix socket', socket_path)
+        else:
+            print('serving on http://' + host + ':' + str(port))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.executor.shutdown(cancel_futures=True)  # type: ignore
+
+
+def create_server(
+    *,
+    host: str = '127.0.0.1',
+    port: int = 8765,
+    socket_path: str | None = None,
+    n_workers: int | None = None,
+    timeout: float = 60,
+    max_queue: int = 64,
+    base_dir: str = '.',
+    setup_formatting: bool = False,
+    verbose: bool = True,
+) -> socketserver.BaseServer:
+    """create render server and warm up its worker pool"""
+    import concurrent.futures
+    import os
+
+    from . import plot_render
+
+    executor = concurrent.futures.ProcessPoolExecutor(
+        max_workers=n_workers,
+        initializer=plot_render._warm_worker,
+        initargs=(setup_formatting,),
+    )
+
+    # start every worker now rather than on first request
+    n_processes = executor._max_workers  # type: ignore
+    warmups = [executor.submit(time.sleep, 0.1) for _ in range(n_processes)]
+    concurrent.futures.wait(warmups)
+
+    server: socketserver.BaseServer
+    if socket_path is not None:
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        server = _UnixHTTPServer(socket_path, _RenderHandler)
+    else:
+        server = http.server.ThreadingHTTPServer((host, port), _RenderHandler)
+    server.executor = executor  # type: ignore
+    server.timeout_seconds = timeout  # type: ignore
+    server.queue_slots = threading.BoundedSemaphore(max_queue)  # type: ignore
+    server.base_dir = os.path.abspath(base_dir)  # type: ignore
+    server.verbose = verbose  # type: ignore
+    server.metrics = _Metrics()  # type: ignore
+    return server
+
+
+class _UnixHTTPServer(
+    socketserver.ThreadingMixIn, socketserver.UnixStreamServer
+):
+    daemon_threads = True
+
+
+class _Metrics:
+    def __init__(self) -> None:
+        import collections
+
+        self.lock = threading.Lock()
+        self.counts = {
+            'n_requests': 0,
+            'n_completed': 0,
+            'n_failed': 0,
+            'n_timeouts': 0,
+            'n_rejected': 0,
+            'n_queued': 0,
+        }
+        self.latencies: dict[str, typing.Deque[float]] = {
+            name: collections.deque(maxlen=n_latency_samples)
+            for name in ['queue', 'render', 'total']
+        }
+
+    def increment(self, name: str, amount: int = 1) -> None:
+        with self.lock:
+            self.counts[name] += amount
+
+    def record(self, name: str, seconds: float) -> None:
+        with self.lock:
+            self.latencies[name].append(seconds)
+
+    def summarize(self) -> ServerMetrics:
+        with self.lock:
+            latency = {
+                name: _summarize_latencies(list(values))
+                for name, values in self.latencies.items()
+            }
+            return dict(self.counts, latency=latency)  # type: ignore
+
+
+def _summarize_latencies(values: list[float]) -> dict[str, float | None]:
+    values = sorted(values)
+    summary: dict[str, float | None] = {'n': len(values)}
+    for name, quantile in [('p50', 0.5), ('p90', 0.9), ('p99', 0.99)]:
+        if len(values) == 0:
+            summary[name] = None
+        else:
+            summary[name] = values[int(quantile * (len(values) - 1))]
+    summary['max'] = values[-1] if len(values) > 0 else None
+    return summary
+
+
+class _RenderHandler(http.server.BaseHTTPRequestHandler):
+    def do_GET(self) -> None:
+        import json
+
+        if self.path == '/metrics':
+            metrics = self.server.metrics.summarize()  # type: ignore
+            self._respond(200, json.dumps(metrics).encode(), 'application/json')
+        elif self.path == '/health':
+            self._respond(200, b'ok', 'text/plain')
+        else:
+            self._respond(404, b'not found', 'text/plain')
+
+    def do_POST(self) -> None:
+        import concurrent.futures
+        import json
+        import urllib.parse
+
+        from . import plot_render
+
+        url = urllib.parse.urlparse(self.path)
+        if url.path != '/render':
+            self._respond(404, b'not found', 'text/plain')
+            return
+        query = urllib.parse.parse_qs(url.query)
+        format = query.get('format', ['png'])[0]
+
+        server: typing.Any = self.server
+        metrics: _Metrics = server.metrics
+        metrics.increment('n_requests')
+        t_start = time.perf_counter()
+
+        # reject instead of queueing without bound
+        if not server.queue_slots.acquire(blocking=False):
+            metrics.increment('n_rejected')
+            self._respond(503, b'render queue full', 'text/plain')
+            return
+        metrics.increment('n_queued')
+
+        def release_slot(*args: typing.Any) -> None:
+            metrics.increment('n_queued', -1)
+            server.queue_slots.release()
+
+        # malformed requests are client errors, checked before queueing
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            spec = json.loads(self.rfile.read(length))
+            if not isinstance(spec, dict):
+                raise Exception('spec must be a json object')
+            plot_render.get_spec_formats(spec, [format])
+            plot_render.check_spec(spec, server.base_dir)
+            future = server.executor.submit(
+                _render_request, spec, format, server.base_dir
+            )
+        except Exception as e:
+            release_slot()
+            metrics.increment('n_failed')
+            message = type(e).__name__ + ': ' + str(e)
+            self._respond(400, message.encode(), 'text/plain')
+            return
+
+        # running tasks cannot be cancelled, so a timed out render keeps
+        # its queue slot until its worker actually finishes it
+        future.add_done_callback(release_slot)
+        try:
+            content, render_seconds = future.result(
+                timeout=server.timeout_seconds
+            )
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            metrics.increment('n_timeouts')
+            self._respond(504, b'render timed out', 'text/plain')
+            return
+        except Exception as e:
+            metrics.increment('n_failed')
+            message = type(e).__name__ + ': ' + str(e)
+            self._respond(500, message.encode(), 'text/plain')
+            return
+
+        t_end = time.perf_counter()
+        metrics.increment('n_completed')
+        metrics.record('render', render_seconds)
+        metrics.record('queue', t_end - t_start - render_seconds)
+        metrics.record('total', t_end - t_start)
+        self._respond(200, content, content_types.get(format, 'text/plain'))
+
+    def _respond(self, status: int, content: bytes, content_type: str) -> None:
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def address_string(self) -> str:
+        if isinstance(self.client_address, tuple):
+            return str(self.client_address[0])
+        else:
+            return 'unix'
+
+    def log_message(self, format: str, *args: typing.Any) -> None:
+        if self.server.verbose:  # type: ignore
+            super().log_message(format, *args)
+
+
+def _render_request(
+    spec: dict[str, typing.Any], format: str, base_dir: str
+) -> tuple[bytes, float]:
+    """render spec in worker process, returning content and render time"""
+    from . import plot_render
+
+    t_start = time.perf_counter()
+    outputs = plot_render.render_spec(spec, [format], base_dir=base_dir)
+    return outputs[format], time.perf_counter() - t_start
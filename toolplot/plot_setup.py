@@ -1,8 +1,12 @@
 from __future__ import annotations
 
 
-def setup_plot_formatting() -> None:
-    """set up matplotlib plot formatting"""
+def setup_plot_formatting(preflight: bool = True) -> None:
+    """set up matplotlib plot formatting
+
+    with preflight, font families are resolved once and pinned, see
+    plot_fonts.preflight_fonts()
+    """
 
     # TODO: load from config
 
@@ -31,3 +35,8 @@ def setup_plot_formatting() -> None:
     plt.rcParams['font.family'] = 'Monospace'
 
     plt.rc('lines', linewidth=3)  # width of lines
+
+    if preflight:
+        from . import plot_fonts
+
+        plot_fonts.preflight_fonts()
@@ -0,0 +1,285 @@
+"""level-of-detail traces for exported plotly html
+
+long line traces are exported at their coarsest level, and carry a pyramid
+of min/max decimations of increasing resolution, up to the full data. a
+small relayout handler (lod_script) switches each trace to the finest level
+whose points in the visible window fit within the point budget
+"""
+
+from __future__ import annotations
+
+import typing
+
+if typing.TYPE_CHECKING:
+    import numpy as np
+
+
+# key of the level pyramid inside each exported trace
+lod_key = 'toolplot_lod'
+
+# trace attributes with one value per point, decimated along with x and y
+_point_array_names = ['customdata', 'text', 'hovertext']
+
+lod_script = """
+(function () {
+    var gd = document.getElementById('{plot_id}');
+    var decoded = {};
+    var current = {};
+
+    function decode(text) {
+        var bytes = atob(text);
+        var buffer = new Uint8Array(bytes.length);
+        for (var i = 0; i < bytes.length; i++) {
+            buffer[i] = bytes.charCodeAt(i);
+        }
+        return new Float64Array(buffer.buffer);
+    }
+
+    function getLevels(index) {
+        if (!(index in decoded)) {
+            var lod = gd.data[index].%(key)s;
+            decoded[index] = lod.levels.map(function (level) {
+                // per-point arrays like customdata are plain json arrays
+                return Object.assign({}, level, {
+                    x: decode(level.x),
+                    y: decode(level.y)
+                });
+            });
+            // the exported trace data is the whole coarsest level
+            current[index] = '0:0:' + decoded[index][0].x.length;
+        }
+        return decoded[index];
+    }
+
+    function lowerBound(values, target) {
+        var lo = 0;
+        var hi = values.length;
+        while (lo < hi) {
+            var mid = (lo + hi) >> 1;
+            if (values[mid] < target) {
+                lo = mid + 1;
+            } else {
+                hi = mid;
+            }
+        }
+        return lo;
+    }
+
+    function update() {
+        // traces restyling the same attributes are restyled together
+        var groups = {};
+        gd.data.forEach(function (trace, index) {
+            if (!trace.%(key)s) {
+                return;
+            }
+            var budget = trace.%(key)s.budget;
+            var axisName = gd._fullData[index].xaxis.replace('x', 'xaxis');
+            var axis = gd._fullLayout[axisName];
+            var lo = axis.r2l(axis.range[0]);
+            var hi = axis.r2l(axis.range[1]);
+            var pad = (hi - lo) / 2;
+            var levels = getLevels(index);
+            var level = levels[0];
+            var start = 0;
+            var end = level.x.length;
+            var l = levels.length - 1;
+            for (; l > 0; l--) {
+                var candidate = levels[l];
+                var first = Math.max(lowerBound(candidate.x, lo - pad) - 1, 0);
+                var last = Math.min(
+                    lowerBound(candidate.x, hi + pad) + 1,
+                    candidate.x.length
+                );
+                if (last - first <= budget) {
+                    level = candidate;
+                    start = first;
+                    end = last;
+                    break;
+                }
+            }
+            var key = l + ':' + start + ':' + end;
+            if (current[index] === key) {
+                return;
+            }
+            current[index] = key;
+            var names = Object.keys(level);
+            var groupKey = names.join(',');
+            if (!(groupKey in groups)) {
+                groups[groupKey] = {update: {}, indices: []};
+                names.forEach(function (name) {
+                    groups[groupKey].update[name] = [];
+                });
+            }
+            var group = groups[groupKey];
+            names.forEach(function (name) {
+                var values = level[name].slice(start, end);
+                if (!Array.isArray(values)) {
+                    values = Array.from(values);
+                }
+                group.update[name].push(values);
+            });
+            group.indices.push(index);
+        });
+        Object.keys(groups).forEach(function (groupKey) {
+            var group = groups[groupKey];
+            Plotly.restyle(gd, group.update, group.indices);
+        });
+    }
+
+    gd.on('plotly_relayout', update);
+    update();
+})();
+""".replace('%(key)s', lod_key)
+
+
+def create_lod_trace(
+    trace: dict[str, typing.Any],
+    budget: int,
+    factor: int = 4,
+) -> dict[str, typing.Any]:
+    """replace data of trace with its coarsest level and attach the pyramid
+
+    only line traces with ascending numeric or datetime x and more than
+    budget points are converted, other traces are returned unchanged. x and
+    y may be arrays or sequences. per-point customdata, text, and hovertext
+    are decimated along with x and y
+    """
+    import numpy as np
+
+    if trace.get('type', 'scatter') not in ['scatter', 'scattergl']:
+        return trace
+    if trace.get('x') is None or trace.get('y') is None:
+        return trace
+    x = np.asarray(trace['x'])
+    y = np.asarray(trace['y'])
+    if x.ndim != 1 or x.shape != y.shape or len(y) <= budget:
+        return trace
+    if not np.issubdtype(y.dtype, np.number):
+        return trace
+    x_values = _get_x_values(x)
+    if x_values is None or not np.all(np.diff(x_values) >= 0):
+        return trace
+
+    # per-point arrays must stay aligned with the decimated points
+    point_arrays = {}
+    for name in _point_array_names:
+        values = trace.get(name)
+        if values is None or isinstance(values, str):
+            continue
+        if isinstance(values, dict):
+            # already encoded as a base64 typed array
+            return trace
+        values = _as_point_array(values)
+        if values.ndim == 0:
+            continue
+        if len(values) != len(y):
+            return trace
+        point_arrays[name] = values
+
+    y_values = y.astype(float)
+    level_indices = get_lod_indices(x_values, y_values, budget, factor)
+    levels = []
+    for indices in level_indices:
+        level: dict[str, typing.Any] = {
+            'x': _encode(x_values[indices]),
+            'y': _encode(y_values[indices]),
+        }
+        for name, values in point_arrays.items():
+            level[name] = _to_list(values[indices])
+        levels.append(level)
+
+    trace = dict(trace)
+    trace['x'] = x[level_indices[0]]
+    trace['y'] = y[level_indices[0]]
+    for name, values in point_arrays.items():
+        trace[name] = _to_list(values[level_indices[0]])
+    trace[lod_key] = {'budget': budget, 'levels': levels}
+    return trace
+
+
+def get_lod_indices(
+    x_values: np.ndarray[typing.Any, typing.Any],
+    y_values: np.ndarray[typing.Any, typing.Any],
+    budget: int,
+    factor: int = 4,
+) -> list[np.ndarray[typing.Any, typing.Any]]:
+    """get point indices of each level, from coarsest to full data
+
+    each level has factor times as many min/max buckets as the one before
+    """
+    import numpy as np
+
+    from . import plot_decimate
+
+    n = len(y_values)
+    n_buckets = max(budget // 4, 1)
+    gaps = plot_decimate.gap_indices(y_values)
+    levels = []
+    while 4 * n_buckets < n:
+        buckets = plot_decimate.get_x_buckets(x_values, n_buckets)
+        indices = plot_decimate.minmax_indices(y_values, buckets)
+        levels.append(np.union1d(indices, gaps))
+        n_buckets *= factor
+    levels.append(np.arange(n))
+    return levels
+
+
+def _get_x_values(
+    x: np.ndarray[typing.Any, typing.Any],
+) -> np.ndarray[typing.Any, typing.Any] | None:
+    """convert x to floats, datetimes become epoch milliseconds like plotly"""
+    import numpy as np
+
+    if x.dtype == object and len(x) > 0:
+        import datetime
+
+        # plotly draws aware datetimes at their wall time, numpy would not
+        if not all(
+            isinstance(value, datetime.date)
+            and getattr(value, 'tzinfo', None) is None
+            for value in x
+        ):
+            return None
+        x = x.astype('datetime64[ms]')
+    if np.issubdtype(x.dtype, np.datetime64):
+        if np.isnat(x).any():
+            return None
+        return x.astype('datetime64[ms]').astype(np.int64).astype(float)
+    elif np.issubdtype(x.dtype, np.number):
+        x_values = x.astype(float)
+        if np.isnan(x_values).any():
+            return None
+        return x_values
+    else:
+        return None
+
+
+def _encode(values: np.ndarray[typing.Any, typing.Any]) -> str:
+    import base64
+
+    import numpy as np
+
+    data = np.ascontiguousarray(values, dtype='<f8').tobytes()
+    return base64.b64encode(data).decode()
+
+
+def _as_point_array(values: typing.Any) -> np.ndarray[typing.Any, typing.Any]:
+    import numpy as np
+
+    if isinstance(values, np.ndarray) or not hasattr(values, '__len__'):
+        return np.asarray(values)
+    # object dtype keeps ragged or mixed rows of customdata intact
+    array = np.empty(len(values), dtype=object)
+    for i, value in enumerate(values):
+        array[i] = value
+    return array
+
+
+def _to_list(values: np.ndarray[typing.Any, typing.Any]) -> list[typing.Any]:
+    """convert to json-ready list, as base64 arrays are not decoded here"""
+    import numpy as np
+
+    if np.issubdtype(values.dtype, np.datetime64):
+        values = np.datetime_as_string(values)
+    result: list[typing.Any] = values.tolist()
+    return result
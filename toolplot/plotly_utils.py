@@ -2,12 +2,15 @@ from __future__ import annotations
 
 import typing
 
+from . import plot_profile
+
 if typing.TYPE_CHECKING:
+    import numpy as np
     import plotly.graph_objects as go  # type: ignore
 
 
 def _output_figure(
-    fig: go.Figure,
+    fig: go.Figure | dict[str, typing.Any],
     *,
     show: bool | None = None,
     show_kwargs: dict[str, typing.Any] | None = None,
@@ -21,35 +24,75 @@ def _output_figure(
     if show is None:
         show = html_path is None and png_path is None
     if show:
-        show_figure(fig, height=height, width=width, show_kwargs=show_kwargs)
+        with plot_profile._stage('show_figure'):
+            show_figure(
+                fig, height=height, width=width, show_kwargs=show_kwargs
+            )
     if html_path is not None:
         if html_path is None:
             raise Exception('set html_path to file path')
         print('writing html to', html_path)
-        export_figure_to_html(fig, html_path=html_path, html_kwargs=html_kwargs)
+        with plot_profile._stage('export_html'):
+            export_figure_to_html(
+                fig, html_path=html_path, html_kwargs=html_kwargs
+            )
     if png_path is not None:
         if png_path is None:
             raise Exception('set output_path to file path')
         print('writing png to', png_path)
-        export_figure_to_png(
-            fig,
-            png_path=png_path,
-            height=height,
-            width=width,
-            png_kwargs=png_kwargs,
-        )
+        with plot_profile._stage('export_png'):
+            export_figure_to_png(
+                fig,
+                png_path=png_path,
+                height=height,
+                width=width,
+                png_kwargs=png_kwargs,
+            )
+
+
+# show_figure() displays figures whose trace data exceeds this many bytes
+# in light_display mode. setting sidecar_dir also writes each full figure
+# to a sidecar html file in that directory
+max_inline_bytes = 10 * 1024 * 1024
+light_display: typing.Literal['png', 'downsampled'] = 'downsampled'
+light_max_points = 2000
+sidecar_dir: str | None = None
 
 
 def show_figure(
-    fig: go.Figure,
+    fig: go.Figure | dict[str, typing.Any],
     *,
     height: int | None = None,
     width: int | None = None,
     show_kwargs: dict[str, typing.Any] | None = None,
+    display: typing.Literal['full', 'png', 'downsampled'] | None = None,
+    sidecar_path: str | None = None,
 ) -> None:
+    """show figure inline, in full or as a light preview
+
+    display 'png' shows a static image, and 'downsampled' shows the figure
+    with long lines decimated to light_max_points points and wide heatmaps
+    averaged to light_max_points columns. by default, figures above
+    max_inline_bytes are shown as light_display
+
+    light displays write the full figure to sidecar_path, or to a new file
+    in sidecar_dir if that is set, and link to it. without either, no file
+    is written and a notice says that the preview is not the full figure.
+    outside of IPython, 'png' falls back to 'downsampled'
+
+    display and sidecar_path can also be given in show_kwargs, for plot
+    functions that only pass show_kwargs through
+
+    fig can be a figure or a plain dict figure spec, which is not validated
+    """
+    import os
+
+    import plotly.io as pio  # type: ignore
+
     # build kwargs
-    if show_kwargs is None:
-        show_kwargs = {}
+    show_kwargs = dict(show_kwargs or {})
+    display = show_kwargs.pop('display', display)
+    sidecar_path = show_kwargs.pop('sidecar_path', sidecar_path)
     if height is None:
         height = 600
     if width is None:
@@ -67,30 +110,395 @@ def show_figure(
             'displayModeBar': False,
         },
     )
+    if display is None:
+        if estimate_payload_bytes(fig) > max_inline_bytes:
+            display = light_display
+        else:
+            display = 'full'
 
     # show figure
-    fig.show(**show_kwargs)
+    if display == 'full':
+        pio.show(fig, validate=False, **show_kwargs)
+        return
+    elif display == 'png' and _get_ipython_display() is not None:
+        with plot_profile._stage('render_png_preview'):
+            png = pio.to_image(
+                fig, format='png', height=height, width=width, validate=False
+            )
+        preview: typing.Any = png
+    elif display in ['png', 'downsampled']:
+        with plot_profile._stage('downsample_figure'):
+            preview = get_downsampled_figure(fig, light_max_points)
+    else:
+        raise Exception('invalid display: ' + str(display))
+
+    if sidecar_path is None and sidecar_dir is not None:
+        import uuid
+
+        name = 'figure_' + uuid.uuid4().hex[:12] + '.html'
+        sidecar_path = os.path.join(sidecar_dir, name)
+    if sidecar_path is not None:
+        with plot_profile._stage('export_sidecar_html'):
+            export_figure_to_html(
+                fig, os.path.abspath(sidecar_path), {'stream': True}
+            )
+        link: str | None = os.path.relpath(sidecar_path)
+    else:
+        link = None
+    _display_preview(preview, link, show_kwargs)
+
+
+def _display_preview(
+    preview: dict[str, typing.Any] | bytes,
+    link: str | None,
+    show_kwargs: dict[str, typing.Any],
+) -> None:
+    """show preview followed by a link or a notice of the missing data
+
+    png previews need IPython
+    """
+    import html
+
+    import plotly.io as pio
+
+    ipython_display = _get_ipython_display()
+    if isinstance(preview, bytes):
+        ipython_display.display(ipython_display.Image(data=preview))
+    else:
+        pio.show(preview, validate=False, **show_kwargs)
+    if link is None:
+        notice = (
+            'showing a light preview without all data. set sidecar_path '
+            'or plotly_utils.sidecar_dir to keep the full figure, or pass '
+            "display='full'"
+        )
+        if ipython_display is None:
+            print(notice)
+        else:
+            ipython_display.display(
+                ipython_display.HTML('<i>' + html.escape(notice) + '</i>')
+            )
+    elif ipython_display is None:
+        print('full figure:', link)
+    else:
+        anchor = '<a href="{0}" target="_blank">full figure: {0}</a>'
+        ipython_display.display(
+            ipython_display.HTML(anchor.format(html.escape(link)))
+        )
+
+
+def _get_ipython_display() -> typing.Any:
+    """get IPython.display module, which is untyped, or None"""
+    try:
+        import IPython.display
+    except ImportError:
+        return None
+    return IPython.display
+
+
+_data_array_keys = ['x', 'y', 'z', 'customdata', 'text', 'hovertext']
+
+
+def estimate_payload_bytes(fig: go.Figure | dict[str, typing.Any]) -> int:
+    """estimate size of the trace data in the figure's json
+
+    numeric arrays count their binary size, which plotly sends as base64.
+    datetimes and other elements are sent as text, and count 30 and 16
+    bytes per element
+    """
+    import numpy as np
+
+    n_bytes = 0
+    for trace in fig['data']:
+        for key in _data_array_keys:
+            value = trace[key] if key in trace else None
+            if value is None or isinstance(value, str):
+                continue
+            if isinstance(value, np.ndarray):
+                if np.issubdtype(value.dtype, np.number):
+                    n_bytes += value.nbytes * 4 // 3
+                elif np.issubdtype(value.dtype, np.datetime64):
+                    n_bytes += 30 * value.size
+                else:
+                    n_bytes += 16 * value.size
+            elif len(value) > 0 and isinstance(value[0], (list, tuple)):
+                n_bytes += 16 * sum(len(row) for row in value)
+            else:
+                n_bytes += 16 * len(value)
+    return n_bytes
+
+
+def get_downsampled_figure(
+    fig: go.Figure | dict[str, typing.Any], max_points: int
+) -> dict[str, typing.Any]:
+    """copy figure with each long line reduced to at most about max_points
+    min/max points, and each heatmap to at most max_points column means
+
+    only traces with ascending numeric or datetime x are downsampled. gaps
+    of missing values are kept unless there are more than max_points of them.
+    returns a plain dict figure spec
+    """
+    if isinstance(fig, dict):
+        layout = fig.get('layout', {})
+    else:
+        layout = fig.layout.to_plotly_json()
+    traces = []
+    for trace in fig['data']:
+        if isinstance(trace, dict):
+            plain = dict(trace)
+        else:
+            plain = trace.to_plotly_json()
+        if plain.get('type') in ['scatter', 'scattergl']:
+            plain = _downsample_line(plain, max_points)
+        elif plain.get('type') == 'heatmap':
+            plain = _downsample_heatmap(plain, max_points)
+        traces.append(plain)
+    return {'data': traces, 'layout': layout}
+
+
+def _downsample_line(
+    trace: dict[str, typing.Any], max_points: int
+) -> dict[str, typing.Any]:
+    import numpy as np
+
+    from . import plot_decimate
+    from . import plotly_lod
+
+    x = trace.get('x')
+    y = trace.get('y')
+    if not isinstance(x, np.ndarray) or not isinstance(y, np.ndarray):
+        return trace
+    if x.ndim != 1 or x.shape != y.shape or len(y) <= max_points:
+        return trace
+    if not np.issubdtype(y.dtype, np.number):
+        return trace
+    x_values = plotly_lod._get_x_values(x)
+    if x_values is None or not np.all(np.diff(x_values) >= 0):
+        return trace
+
+    y_values = y.astype(float)
+    buckets = plot_decimate.get_x_buckets(x_values, max(max_points // 4, 1))
+    indices = plot_decimate.minmax_indices(y_values, buckets)
+    is_nan = np.isnan(y_values)
+    if 2 * np.count_nonzero(is_nan[1:] != is_nan[:-1]) <= max_points:
+        indices = np.union1d(indices, plot_decimate.gap_indices(y_values))
+    else:
+        indices = indices[~is_nan[indices]]
+    trace = dict(trace)
+    for key in _data_array_keys:
+        value = trace.get(key)
+        if isinstance(value, np.ndarray) and len(value) == len(y):
+            trace[key] = value[indices]
+        elif isinstance(value, (list, tuple)) and len(value) == len(y):
+            trace[key] = [value[index] for index in indices]
+    return trace
+
+
+def _downsample_heatmap(
+    trace: dict[str, typing.Any], max_points: int
+) -> dict[str, typing.Any]:
+    import numpy as np
+
+    x = trace.get('x')
+    z = trace.get('z')
+    if not isinstance(x, np.ndarray) or not isinstance(z, np.ndarray):
+        return trace
+    if z.ndim != 2 or len(x) not in [z.shape[1], z.shape[1] + 1]:
+        return trace
+    if z.shape[1] <= max_points:
+        return trace
+    if not np.issubdtype(z.dtype, np.number):
+        return trace
+
+    # average blocks of columns, each placed at its first column's x. x may
+    # also be cell edges, then the last edge is kept to close the last block
+    step = -(-z.shape[1] // max_points)
+    starts = np.arange(0, z.shape[1], step)
+    trace = dict(trace)
+    trace['z'] = _mean_column_blocks(z, starts)
+    if len(x) == z.shape[1]:
+        trace['x'] = x[starts]
+    else:
+        trace['x'] = np.append(x[starts], x[-1])
+    customdata = trace.get('customdata')
+    if (
+        isinstance(customdata, np.ndarray)
+        and customdata.shape == z.shape
+        and np.issubdtype(customdata.dtype, np.number)
+    ):
+        # per-cell numbers like counts are averaged along with z
+        trace['customdata'] = _mean_column_blocks(customdata, starts)
+    elif customdata is not None:
+        # per-cell strings no longer describe the averaged cells
+        import re
+
+        del trace['customdata']
+        if 'hovertemplate' in trace:
+            trace['hovertemplate'] = re.sub(
+                r'%\{customdata(:[^}]*)?\}', r'%{z\1}', trace['hovertemplate']
+            )
+    return trace
+
+
+def _mean_column_blocks(
+    values: np.ndarray[typing.Any, typing.Any],
+    starts: np.ndarray[typing.Any, typing.Any],
+) -> np.ndarray[typing.Any, typing.Any]:
+    """average blocks of columns beginning at starts, ignoring nan"""
+    import numpy as np
+
+    values = values.astype(float)
+    present = ~np.isnan(values)
+    sums = np.add.reduceat(np.where(present, values, 0), starts, axis=1)
+    counts = np.add.reduceat(present, starts, axis=1)
+    with np.errstate(invalid='ignore'):
+        means: np.ndarray[typing.Any, typing.Any] = np.where(
+            counts > 0, sums / counts, np.nan
+        )
+    return means
 
 
 def export_figure_to_html(
-    fig: go.Figure,
+    fig: go.Figure | dict[str, typing.Any],
     html_path: str,
     html_kwargs: dict[str, typing.Any] | None = None,
 ) -> None:
+    """export figure to html
+
+    html_kwargs['stream'] uses write_html_stream(), which is the default for
+    .gz paths and for html_kwargs['lod_points']
+    """
     import os
 
+    import plotly.io as pio
+
     # build kwargs
-    if html_kwargs is None:
-        html_kwargs = {}
+    html_kwargs = dict(html_kwargs or {})
     html_kwargs.setdefault('config', {'displayModeBar': False})
+    stream = html_kwargs.pop(
+        'stream', html_path.endswith('.gz') or 'lod_points' in html_kwargs
+    )
 
     # export html
     os.makedirs(os.path.dirname(html_path), exist_ok=True)
-    fig.write_html(html_path, **html_kwargs)
+    if stream:
+        write_html_stream(fig, html_path, **html_kwargs)
+    else:
+        pio.write_html(fig, html_path, validate=False, **html_kwargs)
+
+
+_data_placeholder = '__toolplot_trace_data__'
+
+
+def write_html_stream(
+    fig: go.Figure | dict[str, typing.Any],
+    html_path: str,
+    *,
+    gzip: bool | None = None,
+    compresslevel: int = 6,
+    lod_points: int | None = None,
+    lod_factor: int = 4,
+    **html_kwargs: typing.Any,
+) -> None:
+    """write figure to html one trace at a time
+
+    fig.write_html() builds the json of all traces and then the whole html
+    document in memory. here, the html around the data comes from plotly's
+    own to_html() on a figure without traces, and each trace is serialized
+    and written separately, so peak memory stays near the largest trace
+
+    gzip defaults to whether html_path ends with .gz. html_kwargs are
+    passed to plotly.io.to_html(), e.g. config, include_plotlyjs, post_script
+
+    with lod_points, long line traces are written as level-of-detail traces
+    that show at most lod_points points around the visible window, see
+    plotly_lod. traces on an x axis with a rangeslider are also drawn in the
+    slider, so they are left as they are
+    """
+    import copy
+    import gzip as gzip_module
+
+    import plotly.io as pio
+    from plotly.io.json import to_json_plotly  # type: ignore
+
+    try:
+        # plotly >= 6 sends arrays as base64 typed arrays
+        from _plotly_utils.utils import convert_to_base64  # type: ignore
+    except ImportError:
+        convert_to_base64 = None
+
+    if isinstance(fig, dict):
+        traces = fig.get('data', [])
+        skeleton = {key: value for key, value in fig.items() if key != 'data'}
+    else:
+        traces = fig.data
+        skeleton = {'layout': fig.layout.to_plotly_json()}
+        if fig.frames:
+            skeleton['frames'] = [
+                frame.to_plotly_json() for frame in fig.frames
+            ]
+    skeleton['data'] = [_data_placeholder]
+    slider_axes = _get_rangeslider_axes(skeleton.get('layout') or {})
+    if lod_points is not None:
+        from . import plotly_lod
+
+        post_script = html_kwargs.get('post_script') or []
+        if isinstance(post_script, str):
+            post_script = [post_script]
+        html_kwargs['post_script'] = [*post_script, plotly_lod.lod_script]
+
+    # split plotly's html at the data array
+    html = pio.to_html(skeleton, validate=False, **html_kwargs)
+    head, tail = html.split(to_json_plotly([_data_placeholder]), 1)
+    del html
+
+    if gzip is None:
+        gzip = html_path.endswith('.gz')
+    f: typing.IO[str]
+    if gzip:
+        f = gzip_module.open(
+            html_path, 'wt', encoding='utf-8', compresslevel=compresslevel
+        )
+    else:
+        f = open(html_path, 'w', encoding='utf-8')
+    with f:
+        f.write(head)
+        f.write('[')
+        for t, trace in enumerate(traces):
+            if t > 0:
+                f.write(',')
+            if isinstance(trace, dict):
+                trace = copy.deepcopy(trace)
+            else:
+                trace = trace.to_plotly_json()
+            if (
+                lod_points is not None
+                and trace.get('xaxis', 'x') not in slider_axes
+            ):
+                trace = plotly_lod.create_lod_trace(
+                    trace, lod_points, lod_factor
+                )
+            if convert_to_base64 is not None:
+                convert_to_base64(trace)
+            f.write(to_json_plotly(trace))
+        f.write(']')
+        f.write(tail)
+
+
+def _get_rangeslider_axes(layout: typing.Mapping[str, typing.Any]) -> set[str]:
+    """get ids of x axes that show a rangeslider, e.g. {'x'}"""
+    axes = set()
+    for key, axis in layout.items():
+        if not key.startswith('xaxis') or not isinstance(axis, dict):
+            continue
+        rangeslider = axis.get('rangeslider')
+        if rangeslider is not None and rangeslider.get('visible', True):
+            axes.add('x' + key[len('xaxis') :])
+    return axes
 
 
 def export_figure_to_png(
-    fig: go.Figure,
+    fig: go.Figure | dict[str, typing.Any],
     png_path: str,
     scale: int = 4,
     height: int | None = None,
@@ -99,6 +507,8 @@ def export_figure_to_png(
 ) -> None:
     import os
 
+    import plotly.io as pio
+
     # build kwargs
     if png_kwargs is None:
         png_kwargs = {}
@@ -113,4 +523,171 @@ def export_figure_to_png(
 
     # export png
     os.makedirs(os.path.dirname(png_path), exist_ok=True)
-    fig.write_image(png_path, format='png', **png_kwargs)
+    pio.write_image(fig, png_path, validate=False, **png_kwargs)
+
+
+def get_d3_format(
+    metric_format: typing.Mapping[str, typing.Any] | None,
+    values: typing.Any = None,
+    *,
+    scale: int | float = 1,
+) -> tuple[str, str, str] | None:
+    """translate toolstr number format kwargs into a d3 number format
+
+    returns (prefix, d3_format, suffix), or None if the format has no d3
+    equivalent and values must be formatted by toolstr one by one
+
+    toolstr picks decimals based on each value's magnitude, so when decimals
+    is not given, values are inspected to find one d3 format valid for all
+    values. order_of_magnitude maps to d3 SI suffixes (k, M) only when all
+    values are within [1e3, 1e9), where the two agree up to significant
+    digits
+
+    scale is the factor between plotted values and the values that
+    metric_format describes, e.g. 100 for percentages plotted as 0-100
+    """
+    if metric_format is None:
+        metric_format = {}
+    supported = {
+        'format_type',
+        'percentage',
+        'signed',
+        'commas',
+        'decimals',
+        'nonfractional_decimals',
+        'fractional_decimals',
+        'trailing_zeros',
+        'prefix',
+        'prefix_after_sign',
+        'postfix',
+        'order_of_magnitude',
+    }
+    if any(key not in supported for key in metric_format.keys()):
+        return None
+    if metric_format.get('format_type') not in [None, 'number']:
+        return None
+
+    percentage = metric_format.get('percentage', False)
+    signed = metric_format.get('signed', False)
+    decimals = metric_format.get('decimals')
+    trailing_zeros = metric_format.get('trailing_zeros')
+    prefix = metric_format.get('prefix') or ''
+    suffix = metric_format.get('postfix') or ''
+    if metric_format.get('prefix_after_sign') is not None:
+        if signed:
+            return None
+        prefix = prefix + metric_format['prefix_after_sign']
+    if scale != 1 and not (percentage and scale == 100):
+        return None
+
+    sign = '+' if signed else ''
+    commas = ',' if metric_format.get('commas', True) else ''
+
+    if metric_format.get('order_of_magnitude', False):
+        if percentage:
+            return None
+        # below 1e3 toolstr writes plain decimals where d3 writes m or u,
+        # and from 1e9 toolstr writes B where d3 writes G
+        magnitudes = _get_magnitudes(values)
+        if (
+            magnitudes is None
+            or not ((magnitudes >= 1e3) & (magnitudes < 1e9)).all()
+        ):
+            return None
+        if decimals is None:
+            precision = 3
+        else:
+            precision = decimals + 1
+        tilde = '~' if trailing_zeros is False else ''
+        return prefix, sign + '.' + str(precision) + tilde + 's', suffix
+
+    if decimals is None:
+        decimals = _get_default_decimals(metric_format, values)
+        if decimals is None:
+            return None
+        if trailing_zeros is None:
+            trailing_zeros = False
+    tilde = '~' if trailing_zeros is False else ''
+
+    if percentage and scale == 1:
+        number_type = '%'
+    else:
+        number_type = 'f'
+        if percentage:
+            suffix = '%' + suffix
+    d3_format = sign + commas + '.' + str(decimals) + tilde + number_type
+    return prefix, d3_format, suffix
+
+
+def _get_default_decimals(
+    metric_format: typing.Mapping[str, typing.Any],
+    values: typing.Any,
+) -> int | None:
+    """find the decimals toolstr would use for every value, if they agree"""
+    import numpy as np
+    import polars as pl
+
+    if values is None:
+        return None
+    series = pl.Series(values)
+    if series.dtype.is_integer() and not metric_format.get('percentage'):
+        return 0
+    if not series.dtype.is_numeric():
+        return None
+
+    magnitudes = series.drop_nulls().abs().to_numpy()
+    if metric_format.get('percentage'):
+        magnitudes = magnitudes * 100
+    magnitudes = magnitudes[magnitudes != 0]
+    if np.isnan(magnitudes).any():
+        return None
+    large = magnitudes >= 1
+    if large.all():
+        return typing.cast(int, metric_format.get('nonfractional_decimals', 2))
+    elif (~large).all() and (magnitudes >= 0.0001).all():
+        return typing.cast(int, metric_format.get('fractional_decimals', 6))
+    else:
+        return None
+
+
+def _get_magnitudes(
+    values: typing.Any,
+) -> np.ndarray[typing.Any, typing.Any] | None:
+    """get absolute values without nulls, None if not numeric or has nan"""
+    import numpy as np
+    import polars as pl
+
+    if values is None:
+        return None
+    series = pl.Series(values)
+    if not series.dtype.is_numeric():
+        return None
+    magnitudes = series.drop_nulls().abs().to_numpy().astype(float)
+    if np.isnan(magnitudes).any():
+        return None
+    return magnitudes
+
+
+def get_log_axis_ticks(
+    log_min: float,
+    log_max: float,
+    tick_format: typing.Mapping[str, typing.Any] | None = None,
+) -> dict[str, typing.Any]:
+    """get tickvals and ticktext of an axis plotted in log10 units
+
+    ticks are placed at each power of ten and labeled in original units
+    """
+    import math
+
+    import numpy as np
+    import toolstr
+
+    if tick_format is None:
+        tick_format = {}
+    tickvals = list(range(math.ceil(log_min), math.floor(log_max) + 1))
+    if len(tickvals) < 2:
+        tickvals = list(np.linspace(log_min, log_max, 5))
+    ticktext = [
+        toolstr.format(10.0**value, **tick_format) for value in tickvals
+    ]
+    return {'tickvals': tickvals, 'ticktext': ticktext}
@@ -1,5 +1,9 @@
 from .bar_plots import *
 from .candlestick_plots import *
 from .log_histograms import *
-from .two_dim_log_histogram import plot_2d_log_histogram
+from .log_sketch import *
+from .two_dim_log_histogram import (
+    plot_2d_log_histogram,
+    plot_2d_log_histogram_plotly,
+)
 from .group_plots import *
@@ -2,34 +2,171 @@ from __future__ import annotations
 
 import typing
 import matplotlib.pyplot as plt
+import matplotlib.ticker
 
 from .. import plot_ticks
 
 if typing.TYPE_CHECKING:
+    import numpy as np
+    import polars as pl
+
     Series = typing.Any
 
 
-def plot_bar(data: typing.Mapping[str, Series]):
-    bottom = 0
+# above this many bars, the legend location is picked from the stack tops
+max_best_legend_bars = 1000
+
+
+def plot_bar(
+    data: typing.Mapping[str, Series] | pl.DataFrame,
+    *,
+    label_column: str | None = None,
+) -> None:
+    """plot series as stacked bars, one bar per category
+
+    data is a mapping of series name to series, or a polars frame with one
+    column per series plus a column of category labels. label_column
+    defaults to the frame's first column if that column is not numeric
+
+    each series is drawn as a single collection, and x tick labels are
+    thinned so that they do not overlap at the axes width
+    """
+    import matplotlib.collections
+    import numpy as np
+
+    names, heights, labels = _get_bar_data(data, label_column)
+    n_categories = heights.shape[1]
+
+    # stack missing values as zero height
+    filled = np.nan_to_num(heights)
+    tops = np.cumsum(filled, axis=0)
+    bottoms = tops - filled
 
-    for series_name, series in data.items():
-        plt.bar(
-            range(len(series)),
-            height=series,
-            bottom=bottom,
-            label=series_name,
+    ax = plt.gca()
+    left = np.arange(n_categories) - 0.4
+    right = left + 0.8
+    # advance the axes' own patch color cycle like ax.bar, so series after
+    # earlier bars or a custom ax.set_prop_cycle() get the next colors
+    patch_cycle: typing.Any = ax._get_patches_for_fill  # type: ignore
+    for s, name in enumerate(names):
+        verts = np.empty((n_categories, 4, 2))
+        verts[:, :2, 0] = left[:, np.newaxis]
+        verts[:, 2:, 0] = right[:, np.newaxis]
+        verts[:, [0, 3], 1] = bottoms[s][:, np.newaxis]
+        verts[:, [1, 2], 1] = tops[s][:, np.newaxis]
+        collection = matplotlib.collections.PolyCollection(
+            verts[~np.isnan(heights[s])],
+            facecolors=patch_cycle.get_next_color(),
+            edgecolors='none',
+            label=name,
         )
-        bottom = bottom + series
+        collection.sticky_edges.y.append(0)
+        ax.add_collection(collection)
+    ax.autoscale_view()
 
-    if len(data) > 1:
-        plt.legend()
+    if len(names) > 1:
+        plt.legend(loc=_get_legend_loc(tops))
 
+    ax.xaxis.set_major_locator(_LabelLocator(labels))
     plot_ticks.add_tick_grid()
     plot_ticks.format_yticks()
-
-    xtick_labels = series.index.values
     plot_ticks.format_xticks(
-        formatter=lambda tick, _: xtick_labels[int(tick)]
-        if int(tick) < len(xtick_labels)
-        else ''
+        formatter=lambda tick, _: (
+            labels[int(tick)] if 0 <= int(tick) < len(labels) else ''
+        )
     )
+
+
+def _get_bar_data(
+    data: typing.Mapping[str, Series] | pl.DataFrame,
+    label_column: str | None,
+) -> tuple[list[str], np.ndarray[typing.Any, typing.Any], list[str]]:
+    """get series names, (series x category) heights, and category labels"""
+    import collections.abc
+
+    import numpy as np
+    import polars as pl
+
+    if isinstance(data, pl.DataFrame):
+        if label_column is None and not data.dtypes[0].is_numeric():
+            label_column = data.columns[0]
+        names = [name for name in data.columns if name != label_column]
+        heights = (
+            data.select(pl.col(names).cast(pl.Float64))
+            .to_numpy()
+            .T.reshape(len(names), len(data))
+        )
+        if label_column is not None:
+            label_values: typing.Iterable[typing.Any] = data[label_column]
+        else:
+            label_values = range(len(data))
+    else:
+        names = list(data.keys())
+        heights = np.vstack(
+            [np.asarray(series, dtype=float) for series in data.values()]
+        )
+        last = list(data.values())[-1]
+        # lists also have an index method, only use pandas-like index labels
+        index = getattr(last, 'index', None)
+        if isinstance(index, collections.abc.Sized) and hasattr(
+            index, 'values'
+        ):
+            label_values = index.values
+        else:
+            label_values = range(heights.shape[1])
+    return names, heights, [str(label) for label in label_values]
+
+
+def _get_legend_loc(tops: np.ndarray[typing.Any, typing.Any]) -> str:
+    """pick legend location, like loc='best' but without testing each bar
+
+    matplotlib's search for the best location checks every bar against every
+    candidate location, which takes seconds for thousands of bars. with that
+    many, place the legend in the upper corner whose bars are lowest instead
+    """
+    import numpy as np
+
+    if tops.size <= max_best_legend_bars:
+        return 'best'
+    stack_tops = np.max(tops, axis=0)
+    n_side = max(len(stack_tops) // 3, 1)
+    if np.max(stack_tops[:n_side]) <= np.max(stack_tops[-n_side:]):
+        return 'upper left'
+    else:
+        return 'upper right'
+
+
+class _LabelLocator(matplotlib.ticker.Locator):
+    """tick every k-th category, with k just large enough that labels fit
+
+    k is recomputed from the axes width and x limits at each draw, and ticks
+    stay on multiples of k so that they do not shift when panning
+    """
+
+    def __init__(self, labels: typing.Sequence[str]) -> None:
+        self.n_labels = len(labels)
+        self.max_chars = max((len(label) for label in labels), default=1)
+
+    def __call__(self) -> typing.Sequence[float]:
+        import numpy as np
+
+        vmin, vmax = sorted(self.axis.get_view_interval())  # type: ignore
+        first = max(int(np.ceil(vmin)), 0)
+        last = min(int(np.floor(vmax)), self.n_labels - 1)
+        if last < first:
+            return []
+
+        # estimate label extent, rotated labels only need their height apart
+        axis: typing.Any = self.axis
+        tick = axis.majorTicks[0]
+        font_pixels = tick.label1.get_fontsize() * axis.figure.dpi / 72
+        width = 0.6 * self.max_chars * font_pixels
+        angle = np.radians(tick.label1.get_rotation())
+        if abs(np.sin(angle)) > 0.01:
+            width = min(width, 1.5 * font_pixels / abs(np.sin(angle)))
+
+        axes_pixels = axis.axes.bbox.width
+        pixels_per_label = axes_pixels / max(vmax - vmin, 1)
+        step = max(int(np.ceil(width / pixels_per_label)), 1)
+        start = int(np.ceil(first / step)) * step
+        return list(np.arange(start, last + 1, step))
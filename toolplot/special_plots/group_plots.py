@@ -1,13 +1,30 @@
 from __future__ import annotations
 
 import typing
+from .. import plot_profile
 from .. import plotly_utils
 
 if typing.TYPE_CHECKING:
     import polars as pl
     import plotly.graph_objects as go  # type: ignore
 
-    PlotGroupsMode = typing.Literal['line', 'line_%', 'area', 'area_%', 'bar']
+    from typing_extensions import TypedDict
+
+    PlotGroupsMode = typing.Literal[
+        'line', 'line_%', 'area', 'area_%', 'bar', 'band', 'heatmap'
+    ]
+    GroupTransform = typing.Literal[
+        'rolling_mean', 'rolling_sum', 'cumsum', 'pct_change'
+    ]
+
+    class GroupAggregation(TypedDict):
+        ranking: pl.Series
+        matrix: pl.DataFrame
+
+    class GroupQuantiles(TypedDict):
+        ranking: pl.Series
+        matrix: pl.DataFrame
+        quantiles: pl.DataFrame
 
 
 def plot_groups(
@@ -37,88 +54,145 @@ def plot_groups(
     png_kwargs: dict[str, typing.Any] | None = None,
     html_path: str | None = None,
     html_kwargs: dict[str, typing.Any] | None = None,
-) -> go.Figure:
+    cache: GroupAggregationCache | bool | None = None,
+    rangeslider: typing.Literal['full', 'total', 'groups'] = 'full',
+    rangeslider_max_points: int = 500,
+    validation: typing.Literal['traces', 'figure', 'trusted'] = 'traces',
+    lod_points: int | None = None,
+    quantiles: typing.Sequence[float] = (0.5, 0.9, 0.99),
+    quantile_error: float | None = None,
+    transform: GroupTransform | None = None,
+    window: int | None = None,
+) -> go.Figure | dict[str, typing.Any]:
+    """plot metric over time for each group
+
+    cache (a GroupAggregationCache, or True for a shared default cache)
+    reuses the timestamp x group aggregation across calls on the same data,
+    so that changes of mode, groups, colors, or limits skip the polars work
+
+    rangeslider 'full' draws every trace in the rangeslider. 'total' draws
+    only the sum of the plotted groups, and 'groups' draws each group, both
+    decimated to at most rangeslider_max_points points per trace. for these,
+    the plotted traces are drawn on axes xaxis2 and yaxis2, so restyle
+    layout.yaxis2 instead of layout.yaxis of the returned figure
+
+    validation 'traces' validates each trace object as it is added. 'figure'
+    builds traces as plain dicts in parallel threads and validates the
+    assembled figure once. 'trusted' skips plotly validation entirely, and
+    returns the figure as a plain dict of data and layout
+
+    lod_points exports html where each line holds a pyramid of decimated
+    levels, and zooming switches to the finest level that shows at most
+    lod_points points around the visible window. it needs an overview
+    rangeslider, so rangeslider 'full' is drawn as 'groups'
+
+    mode 'band' plots the distribution of metric values of each group over
+    time, filling between consecutive quantiles and drawing a line at the
+    quantile closest to the median. groups are ranked by number of values.
+    quantile_error computes approximate quantiles within that relative error,
+    which is faster for timestamps with many values per group
+
+    transform replaces each group's series by its rolling mean or rolling sum
+    over window timestamps, its cumulative sum, or its percent change from
+    window timestamps before (default 1). the total and the shares of line_%
+    are computed from the transformed series. without metric_format, percent
+    changes are formatted as signed percentages
+
+    mode 'heatmap' draws the timestamp x group matrix as a single heatmap
+    trace, with groups as rows in ranking order, for more groups than
+    separate traces can handle. colorbar and hover follow metric_format
+    """
     import polars as pl
     import plotly.graph_objects as go
+    import plotly.io as pio  # type: ignore
+
+    if lod_points is not None:
+        if mode not in ['line', 'line_%']:
+            raise Exception('lod_points only supports line modes')
+        if rangeslider == 'full':
+            rangeslider = 'groups'
+        html_kwargs = dict(html_kwargs or {}, lod_points=lod_points)
+    if mode == 'band' and include_total:
+        raise Exception('include_total not supported for band mode')
+    if mode == 'heatmap' and include_total:
+        raise Exception('include_total not supported for heatmap mode')
+    if transform is not None and mode == 'band':
+        raise Exception('transform not supported for band mode')
+    if transform == 'pct_change' and mode in ['line_%', 'area_%']:
+        raise Exception('pct_change transform has no share of total')
+
+    # aggregate timestamp x group matrix
+    aggregation: GroupAggregation | GroupQuantiles
+    if cache is True:
+        cache = get_default_aggregation_cache()
+    if mode == 'band':
+        band_aggregation = aggregate_group_quantiles(
+            data,
+            group_column=group_column,
+            metric_column=metric_column,
+            quantiles=quantiles,
+            quantile_error=quantile_error,
+        )
+        aggregation = band_aggregation
+    elif cache:
+        aggregation = cache.get(
+            data, group_column=group_column, metric_column=metric_column
+        )
+    else:
+        aggregation = aggregate_groups(
+            data, group_column=group_column, metric_column=metric_column
+        )
+    matrix = aggregation['matrix']
 
     # process inputs
     if groups is None:
-        groups = (
-            data.group_by(group_column)
-            .agg(metric=pl.sum(metric_column))
-            .sort('metric', descending=True)[group_column]
-            .to_list()
-        )
+        groups = aggregation['ranking'].to_list()
     if n_groups is not None:
         groups = groups[:n_groups]
     if colors is None:
         colors = {}
-
-    # initialize figure
-    fig = go.Figure()
+    group_columns = _get_matrix_columns(groups, aggregation)
 
     # process data
+    total = None
+    default_pct_format = transform == 'pct_change' and metric_format is None
+    if default_pct_format:
+        metric_format = {'percentage': True, 'signed': True}
+    if transform is not None:
+        with plot_profile._stage('transform_groups', n_rows=len(matrix)):
+            matrix = transform_group_matrix(
+                matrix,
+                transform=transform,
+                window=window,
+                total_column=(
+                    '__total__' if include_total or mode == 'line_%' else None
+                ),
+            )
+        if include_total or mode == 'line_%':
+            total = matrix.select(
+                'timestamp', pl.col('__total__').alias(metric_column)
+            )
+            matrix = matrix.drop('__total__')
+    elif include_total or mode == 'line_%':
+        with plot_profile._stage('compute_total', n_rows=len(matrix)):
+            total = matrix.select(
+                'timestamp',
+                pl.sum_horizontal(pl.exclude('timestamp')).alias(metric_column),
+            )
     if mode == 'line_%':
-        data = data.with_columns(
-            (
-                pl.col(metric_column)
-                / pl.col(metric_column).sum().over('timestamp')
-            ).alias(metric_column)
+        matrix = matrix.with_columns(
+            pl.col(column) / total[metric_column]  # type: ignore
+            for column in group_columns
+            if column in matrix.columns
         )
-        if metric_format is None:
-            metric_format = {}
+        metric_format = dict(metric_format or {})
         metric_format['percentage'] = True
 
-    # add total
-    total: pl.DataFrame | None = None
-    if include_total and mode == 'line':
-        total = (
-            data.group_by('timestamp')
-            .agg(pl.sum(metric_column))
-            .sort('timestamp')
-        )
-        total_scatter = create_scatter_object(
-            x=total['timestamp'],
-            y=total[metric_column],
-            group='TOTAL',
-            color='black',
-            metric_format=metric_format,
-            visible=total_visible,
-            line_width=5,
-            mode=mode,
-            g=None,
-        )
-        fig.add_trace(total_scatter)
-
-    all_timestamps = data.select(pl.col.timestamp.unique()).sort('timestamp')
-    for g, group in enumerate(groups):
-        x, y = get_group_data(
-            data=data,
-            group=group,
-            group_column=group_column,
-            metric_column=metric_column,
-            all_timestamps=all_timestamps,
-            mode=mode,
-        )
-        group_scatter = create_scatter_object(
-            x=x,
-            y=y,
-            group=group,
-            g=g,
-            color=colors.get(group),
-            metric_format=metric_format,
-            mode=mode,
-            bar_gap=bar_gap,
-            bar_outline_width=bar_outline_width,
-            bar_x_center=bar_x_center,
-        )
-        fig.add_trace(group_scatter)
-
-    # update layouts
-    fig.update_layout(
-        template='plotly_white',
+    # build layout
+    layout = dict(
+        template=pio.templates['plotly_white'],
         height=600,
-        hovermode='x unified',
+        hovermode='closest' if mode == 'heatmap' else 'x unified',
         margin=dict(t=55 if title != '' else 0, b=0, l=0, r=0, pad=0),
         title=get_title_params(title),
         xaxis=get_xaxis_params(
@@ -139,23 +213,171 @@ def plot_groups(
             set_ylim=set_ylim,
             label_style=get_label_params(),
             grid_style=get_grid_params(mode=mode),
-            total=total,
+            total=total if mode == 'line' else None,
         ),
         legend=get_legend_params(label_style=get_label_params()),
     )
-
     if mode == 'bar':
-        fig.update_layout(barmode='relative', bargap=0.0, bargroupgap=0.0)
-
-    plotly_utils._output_figure(
-        fig=fig,
-        show=show,
-        show_kwargs=show_kwargs,
-        html_path=html_path,
-        html_kwargs=html_kwargs,
-        png_path=png_path,
-        png_kwargs=png_kwargs,
-    )
+        layout.update(barmode='relative', bargap=0.0, bargroupgap=0.0)
+    if default_pct_format and mode != 'heatmap':
+        layout['yaxis'].update(ticksuffix=None, tickformat='+.0%')
+
+    # build traces
+    trace_kwargs: list[dict[str, typing.Any]] = []
+    if include_total and mode == 'line':
+        trace_kwargs.append(
+            dict(
+                group='TOTAL',
+                g=None,
+                color='black',
+                visible=total_visible,
+                line_width=5,
+            )
+        )
+    if mode == 'heatmap':
+        trace_kwargs.append(dict(group=metric_name))
+    for g, (group, column) in enumerate(zip(groups, group_columns)):
+        if mode == 'heatmap':
+            break
+        trace_kwargs.append(
+            dict(
+                group=group,
+                column=column,
+                g=g,
+                color=colors.get(group),
+                bar_gap=bar_gap,
+                bar_outline_width=bar_outline_width,
+                bar_x_center=bar_x_center,
+            )
+        )
+
+    def get_xy(column: str | None) -> tuple[pl.Series, pl.Series]:
+        if column is None:
+            return total['timestamp'], total[metric_column]  # type: ignore
+        return get_matrix_group_data(
+            matrix=matrix, column=column, metric_column=metric_column, mode=mode
+        )
+
+    if mode == 'band':
+        band_data = band_aggregation['quantiles'].partition_by(
+            group_column, as_dict=True, include_key=False
+        )
+        quantile_names = [get_quantile_name(q) for q in sorted(set(quantiles))]
+
+    def get_band(kwargs: dict[str, typing.Any]) -> list[dict[str, typing.Any]]:
+        group_data = band_data.get((kwargs.pop('column'),))
+        if group_data is None:
+            group_data = band_aggregation['quantiles'].clear()
+        return get_band_trace_params(
+            x=group_data['timestamp'],
+            ys=[group_data[name] for name in quantile_names],
+            quantiles=sorted(set(quantiles)),
+            metric_format=metric_format,
+            group=kwargs['group'],
+            g=kwargs['g'],
+            color=kwargs['color'],
+        )
+
+    def get_heatmap() -> dict[str, typing.Any]:
+        return get_heatmap_trace_params(
+            matrix=matrix,
+            groups=groups,
+            columns=group_columns,
+            metric_name=metric_name,
+            metric_format=metric_format,
+        )
+
+    def get_traces(
+        kwargs: dict[str, typing.Any],
+    ) -> list[dict[str, typing.Any]]:
+        if mode == 'heatmap':
+            return [_to_plain(get_heatmap())]
+        if mode == 'band':
+            return [_to_plain(params) for params in get_band(kwargs)]
+        x, y = get_xy(kwargs.pop('column', None))
+        params = get_trace_params(
+            x=x, y=y, mode=mode, metric_format=metric_format, **kwargs
+        )
+        return [_to_plain(params)]
+
+    if validation == 'traces':
+        fig = go.Figure()
+        for kwargs in trace_kwargs:
+            label = str(kwargs['group'])
+            if mode == 'heatmap':
+                with plot_profile._stage(
+                    'create_heatmap_object', n_rows=len(group_columns)
+                ):
+                    params = get_heatmap()
+                    del params['type']
+                    fig.add_trace(go.Heatmap(**params))
+                continue
+            if mode == 'band':
+                with plot_profile._stage('create_band_objects', label=label):
+                    for params in get_band(kwargs):
+                        del params['type']
+                        fig.add_trace(go.Scatter(**params))
+                continue
+            with plot_profile._stage('get_group_data', label=label) as stage:
+                x, y = get_xy(kwargs.pop('column', None))
+                stage['n_points'] = len(y)
+            with plot_profile._stage(
+                'create_scatter_object', label=label, n_points=len(y)
+            ):
+                group_scatter = create_scatter_object(
+                    x=x, y=y, mode=mode, metric_format=metric_format, **kwargs
+                )
+                fig.add_trace(group_scatter)
+        with plot_profile._stage('update_layout'):
+            fig.update_layout(**layout)
+    elif validation in ['figure', 'trusted']:
+        import concurrent.futures
+
+        # traces are independent, and polars releases the gil for its work
+        with plot_profile._stage('create_traces', n_rows=len(trace_kwargs)):
+            with concurrent.futures.ThreadPoolExecutor() as executor:
+                traces = [
+                    trace
+                    for group_traces in executor.map(get_traces, trace_kwargs)
+                    for trace in group_traces
+                ]
+        with plot_profile._stage('create_figure'):
+            if validation == 'figure':
+                fig = go.Figure(data=traces, layout=_to_plain(layout))
+            else:
+                # plotly.js cannot look up templates by name
+                template = layout['template'].to_plotly_json()
+                fig = {
+                    'data': traces,
+                    'layout': _to_plain(dict(layout, template=template)),
+                }
+    else:
+        raise Exception('invalid validation: ' + str(validation))
+
+    if rangeslider != 'full':
+        with plot_profile._stage('add_rangeslider_overview'):
+            add_rangeslider_overview(
+                fig,
+                matrix=matrix,
+                columns=group_columns,
+                colors=[
+                    get_group_color(colors.get(group), g)
+                    for g, group in enumerate(groups)
+                ],
+                rangeslider=rangeslider,
+                max_points=rangeslider_max_points,
+            )
+
+    with plot_profile._stage('output_figure'):
+        plotly_utils._output_figure(
+            fig=fig,
+            show=show,
+            show_kwargs=show_kwargs,
+            html_path=html_path,
+            html_kwargs=html_kwargs,
+            png_path=png_path,
+            png_kwargs=png_kwargs,
+        )
 
     return fig
 
@@ -176,51 +398,80 @@ def create_scatter_object(
     bar_x_center: bool = True,
 ) -> go.Scatter:
     import plotly.graph_objects as go
-    import toolstr
 
-    if metric_format is None:
-        metric_format = {}
-    custom: list[str | None] = []
-    for value in y:
-        if value is None:
-            custom.append(None)
-        else:
-            custom.append(toolstr.format(value, **metric_format))
+    params = get_trace_params(
+        x=x,
+        y=y,
+        mode=mode,
+        group=group,
+        g=g,
+        color=color,
+        metric_format=metric_format,
+        visible=visible,
+        line_width=line_width,
+        bar_outline_width=bar_outline_width,
+        bar_gap=bar_gap,
+        bar_x_center=bar_x_center,
+    )
+    trace_type = params.pop('type')
+    if trace_type == 'bar':
+        return go.Bar(**params)
+    else:
+        return go.Scatter(**params)
 
-    if color is None:
-        import plotly.io as pio  # type: ignore
 
-        colorway = pio.templates['plotly_white'].layout.colorway
-        if g is None:
-            color = 'black'
-        else:
-            color = colorway[g % len(colorway)]
+def get_trace_params(
+    x: pl.Series,
+    y: pl.Series,
+    mode: PlotGroupsMode,
+    *,
+    group: str,
+    g: int | None = None,
+    color: str | None = None,
+    metric_format: dict[str, typing.Any] | None = None,
+    visible: typing.Literal['legendonly', True, False] = True,
+    line_width: int = 3,
+    bar_outline_width: int | float = 0.1,
+    bar_gap: int | float = 0,
+    bar_x_center: bool = True,
+) -> dict[str, typing.Any]:
+    """get trace kwargs of group as a plain dict, with its plotly type"""
+    if mode in ['line', 'line_%', 'bar']:
+        hover_value, custom = _get_hover_value(
+            y=y,
+            metric_format=metric_format,
+            scale=100 if mode == 'line_%' else 1,
+        )
+    else:
+        hover_value, custom = '%{y}', None
+
+    color = get_group_color(color, g)
 
     if mode == 'line':
-        return go.Scatter(
+        return dict(
+            type='scatter',
             x=x,
             y=y,
             mode='lines',
             name=group,
-            line=dict(color=color, width=line_width),
+            line=dict(color=color, width=line_width, simplify=False),
             legendgroup=group,
             customdata=custom,
-            line_simplify=False,
-            hovertemplate=group + ': %{customdata}<extra></extra>',
+            hovertemplate=group + ': ' + hover_value + '<extra></extra>',
             connectgaps=False,
             visible=visible,
         )
     elif mode == 'line_%':
-        return go.Scatter(
+        return dict(
+            type='scatter',
             x=x,
             y=y * 100,
             mode='lines',
             name=group,
-            line=dict(color=color, width=line_width),
+            line=dict(color=color, width=line_width, simplify=False),
             legendgroup=group,
             customdata=custom,
-            line_simplify=False,
-            hovertemplate=group + ': %{customdata}<extra></extra>',
+            hovertemplate=group + ': ' + hover_value + '<extra></extra>',
             connectgaps=False,
             visible=visible,
         )
@@ -244,26 +495,23 @@ def create_scatter_object(
             width = None
             offset = None
 
-        bar = go.Bar(
+        return dict(
+            type='bar',
             x=x,
             y=y,
             name=group,
-            marker=dict(color=color, line=dict(width=0)),
-            hovertemplate=group + ': %{customdata}<extra></extra>',
+            marker=dict(
+                color=color, line=dict(width=bar_outline_width, color='black')
+            ),
+            hovertemplate=group + ': ' + hover_value + '<extra></extra>',
             legendgroup=group,
             customdata=custom,
             width=width,
             offset=offset,
-            marker_line_width=bar_outline_width,
-            marker_line_color='black',
-        )
-        try:
-            bar._figure._has_bar = True  # won't exist yet when returning
-        except Exception:
-            pass
-        return bar
+        )
     elif mode == 'area':
-        return go.Scatter(
+        return dict(
+            type='scatter',
             x=x,
             y=y,
             mode='lines',
@@ -273,10 +521,10 @@ def create_scatter_object(
             fill='tonexty' if ((g is not None) and (g > 0)) else 'tozeroy',
             fillcolor=color,
             hovertemplate=('%{y}'),
-            customdata=custom,
         )
     elif mode == 'area_%':
-        return go.Scatter(
+        return dict(
+            type='scatter',
             x=x,
             y=y,
             mode='lines',
@@ -287,13 +535,239 @@ def create_scatter_object(
             fill='tonexty' if ((g is not None) and (g > 0)) else 'tozeroy',
             fillcolor=color,
             hovertemplate=('%{y:.1f}%'),
-            customdata=custom,
         )
 
     else:
         raise Exception('invalid mode: ' + str(mode))
 
 
+def get_group_color(color: str | None, g: int | None) -> str:
+    """get color of group, defaulting to the g-th color of the colorway"""
+    if color is not None:
+        return color
+
+    import plotly.io as pio
+
+    colorway = pio.templates['plotly_white'].layout.colorway
+    if g is None:
+        return 'black'
+    else:
+        return colorway[g % len(colorway)]  # type: ignore
+
+
+def get_band_trace_params(
+    x: pl.Series,
+    ys: typing.Sequence[pl.Series],
+    quantiles: typing.Sequence[float],
+    *,
+    group: str,
+    g: int | None = None,
+    color: str | None = None,
+    metric_format: dict[str, typing.Any] | None = None,
+    visible: typing.Literal['legendonly', True, False] = True,
+    line_width: int = 3,
+) -> list[dict[str, typing.Any]]:
+    """get trace kwargs of quantile band of group, as plain dicts
+
+    one trace per ascending quantile, each filled down to the trace before
+    it, then a line at the quantile closest to the median. bands closer to
+    the median are more opaque
+    """
+    color = get_group_color(color, g)
+    median = min(range(len(quantiles)), key=lambda q: abs(quantiles[q] - 0.5))
+
+    distances = []
+    for lower, upper in zip(quantiles[:-1], quantiles[1:]):
+        if lower <= 0.5 <= upper:
+            distances.append(0.0)
+        else:
+            distances.append(min(abs(lower - 0.5), abs(upper - 0.5)))
+    ranks = sorted(set(distances))
+
+    traces = []
+    for q, (quantile, y) in enumerate(zip(quantiles, ys)):
+        name = group + ' ' + get_quantile_name(quantile)
+        if q == median:
+            hover: dict[str, typing.Any] = dict(hoverinfo='skip')
+        else:
+            hover_value, custom = _get_hover_value(y, metric_format, scale=1)
+            hover = dict(
+                customdata=custom,
+                hovertemplate=name + ': ' + hover_value + '<extra></extra>',
+            )
+        if q > 0:
+            opacity = 0.4 / (1 + ranks.index(distances[q - 1]))
+            fill: dict[str, typing.Any] = dict(
+                fill='tonexty', fillcolor=color, opacity=opacity
+            )
+        else:
+            fill = {}
+        traces.append(
+            dict(
+                type='scatter',
+                x=x,
+                y=y,
+                mode='lines',
+                name=name,
+                line=dict(color=color, width=0),
+                legendgroup=group,
+                showlegend=False,
+                visible=visible,
+                **fill,
+                **hover,
+            )
+        )
+
+    y = ys[median]
+    name = group + ' ' + get_quantile_name(quantiles[median])
+    hover_value, custom = _get_hover_value(y, metric_format, scale=1)
+    traces.append(
+        dict(
+            type='scatter',
+            x=x,
+            y=y,
+            mode='lines',
+            name=group,
+            line=dict(color=color, width=line_width, simplify=False),
+            legendgroup=group,
+            customdata=custom,
+            hovertemplate=name + ': ' + hover_value + '<extra></extra>',
+            visible=visible,
+        )
+    )
+    return traces
+
+
+def get_heatmap_trace_params(
+    matrix: pl.DataFrame,
+    *,
+    groups: typing.Sequence[str],
+    columns: typing.Sequence[str],
+    metric_name: str | None = None,
+    metric_format: dict[str, typing.Any] | None = None,
+) -> dict[str, typing.Any]:
+    """get kwargs of one heatmap of the matrix as a plain dict
+
+    rows are groups in the given order, top to bottom. values that have
+    both signs use a diverging colorscale centered on zero. where toolstr
+    would pick decimals per value, all cells use nonfractional_decimals
+    """
+    import numpy as np
+    import polars as pl
+
+    z = (
+        matrix.select(
+            (
+                pl.col(column)
+                if column in matrix.columns
+                else pl.lit(None, dtype=pl.Float64)
+            )
+            .cast(pl.Float64)
+            .alias(str(c))
+            for c, column in enumerate(columns)
+        )
+        .to_numpy()
+        .T
+    )
+    if z.size > 0 and np.nanmin(z, initial=0) < 0 < np.nanmax(z, initial=0):
+        scale: dict[str, typing.Any] = dict(colorscale='RdBu_r', zmid=0)
+    else:
+        scale = dict(colorscale='Viridis')
+
+    colorbar: dict[str, typing.Any] = dict(title=dict(text=metric_name))
+    values = pl.Series(z.ravel()).fill_nan(None)
+    d3_format = plotly_utils.get_d3_format(metric_format, values)
+    if d3_format is None:
+        # prefer one format for all cells over a string per cell
+        decimals = (metric_format or {}).get('nonfractional_decimals', 2)
+        d3_format = plotly_utils.get_d3_format(
+            dict(metric_format or {}, decimals=decimals)
+        )
+    if d3_format is not None:
+        prefix, number_format, suffix = d3_format
+        colorbar.update(
+            tickprefix=prefix or None,
+            tickformat=number_format,
+            ticksuffix=suffix or None,
+        )
+        hover_value = prefix + '%{z:' + number_format + '}' + suffix
+        custom = None
+    else:
+        import toolstr
+
+        format_kwargs = metric_format or {}
+        hover_value = '%{customdata}'
+        custom = [
+            [
+                None
+                if np.isnan(value)
+                else toolstr.format(value, **format_kwargs)
+                for value in row
+            ]
+            for row in z
+        ]
+
+    return dict(
+        type='heatmap',
+        x=matrix['timestamp'],
+        y=[str(group) for group in groups],
+        z=z,
+        customdata=custom,
+        hovertemplate=('%{y}<br>%{x}<br>' + hover_value + '<extra></extra>'),
+        hoverongaps=False,
+        colorbar=colorbar,
+        **scale,
+    )
+
+
+def get_quantile_name(quantile: float) -> str:
+    """name quantile as a percentile, e.g. p50 or p99.9"""
+    return 'p' + '%g' % (quantile * 100)
+
+
+def _to_plain(value: typing.Any) -> typing.Any:
+    """convert series to numpy and drop unset values, for unvalidated figures
+
+    plotly validators normally do this conversion, and treat None as unset
+    """
+    import polars as pl
+
+    if isinstance(value, pl.Series):
+        return value.to_numpy()
+    elif isinstance(value, dict):
+        return {
+            key: _to_plain(item)
+            for key, item in value.items()
+            if item is not None
+        }
+    else:
+        return value
+
+
+def _get_hover_value(
+    y: pl.Series,
+    metric_format: dict[str, typing.Any] | None,
+    scale: int | float,
+) -> tuple[str, list[str | None] | None]:
+    """build hovertemplate value, using per-point strings only if needed"""
+    d3_format = plotly_utils.get_d3_format(metric_format, y, scale=scale)
+    if d3_format is not None:
+        prefix, number_format, suffix = d3_format
+        return prefix + '%{y:' + number_format + '}' + suffix, None
+
+    import toolstr
+
+    if metric_format is None:
+        metric_format = {}
+    custom: list[str | None] = []
+    for value in y:
+        if value is None:
+            custom.append(None)
+        else:
+            custom.append(toolstr.format(value, **metric_format))
+    return '%{customdata}', custom
+
+
 def get_group_data(
     data: pl.DataFrame,
     group: str,
@@ -316,20 +790,45 @@ def get_group_data(
         )
         .sort('timestamp')
     )
-    if mode == 'line':
-        if add_head_pad:
-            non_null = agg.filter(pl.col(metric_column).is_not_null())
-            head_null = agg.filter(pl.col.timestamp < non_null['timestamp'][0])
-            if len(head_null) > 0:
-                head_pad = head_null[-1].fill_null(0)
-                agg = pl.concat([agg, head_pad]).sort('timestamp')
-    elif mode == 'line_%':
+    return _process_group_data(agg, metric_column, mode, add_head_pad)
+
+
+def get_matrix_group_data(
+    matrix: pl.DataFrame,
+    column: str,
+    metric_column: str,
+    mode: PlotGroupsMode,
+    add_head_pad: bool = True,
+) -> tuple[pl.Series, pl.Series]:
+    """get series of one group from an aggregated timestamp x group matrix"""
+    import polars as pl
+
+    if column in matrix.columns:
+        value = pl.col(column)
+    else:
+        value = pl.lit(None, dtype=pl.Float64)
+    agg = matrix.select('timestamp', value.alias(metric_column))
+    return _process_group_data(agg, metric_column, mode, add_head_pad)
+
+
+def _process_group_data(
+    agg: pl.DataFrame,
+    metric_column: str,
+    mode: PlotGroupsMode,
+    add_head_pad: bool,
+) -> tuple[pl.Series, pl.Series]:
+    import polars as pl
+
+    if mode in ['line', 'line_%']:
         if add_head_pad:
             non_null = agg.filter(pl.col(metric_column).is_not_null())
-            head_null = agg.filter(pl.col.timestamp < non_null['timestamp'][0])
-            if len(head_null) > 0:
-                head_pad = head_null[-1].fill_null(0)
-                agg = pl.concat([agg, head_pad]).sort('timestamp')
+            if len(non_null) > 0:
+                head_null = agg.filter(
+                    pl.col.timestamp < non_null['timestamp'][0]
+                )
+                if len(head_null) > 0:
+                    head_pad = head_null[-1].fill_null(0)
+                    agg = pl.concat([agg, head_pad]).sort('timestamp')
     elif mode == 'area':
         pass
     elif mode == 'area_%':
@@ -342,12 +841,592 @@ def get_group_data(
     return agg['timestamp'], agg[metric_column]
 
 
+def aggregate_groups(
+    data: pl.DataFrame,
+    *,
+    group_column: str,
+    metric_column: str,
+) -> GroupAggregation:
+    """aggregate metric into a timestamp x group matrix and rank groups
+
+    matrix has a timestamp column plus one column per group, where a group
+    is null at timestamps without any of its metric values. ranking lists
+    groups by total metric in descending order
+    """
+    import polars as pl
+
+    with plot_profile._stage('aggregate_groups', n_rows=len(data)):
+        long = data.group_by('timestamp', group_column).agg(
+            pl.when(pl.col(metric_column).count() > 0)
+            .then(pl.sum(metric_column))
+            .alias(metric_column)
+        )
+        ranking = (
+            long.group_by(group_column)
+            .agg(pl.sum(metric_column))
+            .sort(metric_column, descending=True)[group_column]
+        )
+        matrix = (
+            long.with_columns(pl.col(group_column).cast(pl.String))
+            .pivot(
+                on=group_column,
+                index='timestamp',
+                values=metric_column,
+                aggregate_function=None,
+            )
+            .sort('timestamp')
+        )
+    return {'ranking': ranking, 'matrix': matrix}
+
+
+def transform_group_matrix(
+    matrix: pl.DataFrame,
+    *,
+    transform: GroupTransform,
+    window: int | None = None,
+    total_column: str | None = None,
+) -> pl.DataFrame:
+    """transform each group column of a timestamp x group matrix
+
+    windows count rows of the matrix. nulls count as zero in rolling and
+    cumulative transforms, but stay null before a group's first value. with
+    total_column, the sum of the groups before transforming is added under
+    that name and transformed like a group, in the same query
+    """
+    import polars as pl
+
+    if transform in ['rolling_mean', 'rolling_sum']:
+        if window is None or window < 1:
+            raise Exception(transform + ' transform requires a window >= 1')
+    elif transform == 'pct_change':
+        if window is not None and window < 1:
+            raise Exception('pct_change window must be >= 1')
+    elif transform != 'cumsum':
+        raise Exception('invalid transform: ' + str(transform))
+
+    columns = [column for column in matrix.columns if column != 'timestamp']
+    lazy = matrix.lazy()
+    if total_column is not None:
+        if total_column in columns:
+            raise Exception('total column collides with a group column')
+        lazy = lazy.with_columns(pl.sum_horizontal(columns).alias(total_column))
+        columns.append(total_column)
+
+    def transform_column(column: str) -> pl.Expr:
+        value = pl.col(column)
+        if transform == 'pct_change':
+            previous = value.shift(1 if window is None else window)
+            return pl.when(previous != 0).then(value / previous - 1)
+        filled = value.fill_null(0)
+        if transform == 'rolling_mean':
+            transformed = filled.rolling_mean(window)  # type: ignore
+        elif transform == 'rolling_sum':
+            transformed = filled.rolling_sum(window)  # type: ignore
+        else:
+            transformed = filled.cum_sum()
+        return pl.when(value.is_not_null().cum_max()).then(transformed)
+
+    return lazy.with_columns(
+        transform_column(column).cast(pl.Float64).alias(column)
+        for column in columns
+    ).collect(engine='in-memory')  # streaming is slow for wide frames
+
+
+def aggregate_group_quantiles(
+    data: pl.DataFrame,
+    *,
+    group_column: str,
+    metric_column: str,
+    quantiles: typing.Sequence[float],
+    quantile_error: float | None = None,
+) -> GroupQuantiles:
+    """aggregate quantiles of metric values per timestamp and group
+
+    quantiles has timestamp, group, and n (number of values) columns, plus
+    one column per quantile named as in get_quantile_name(). matrix holds
+    the quantile closest to the median as a timestamp x group matrix.
+    ranking lists groups by number of values in descending order
+
+    with quantile_error, values are counted in log-spaced buckets instead of
+    being sorted, and each quantile is the center of the bucket that holds
+    it, within quantile_error of the exact value relative to its magnitude.
+    this is faster and needs far less memory for many values per bucket
+    """
+    import polars as pl
+
+    quantiles = sorted(set(quantiles))
+    if any(not 0 <= quantile <= 1 for quantile in quantiles):
+        raise Exception('quantiles must be between 0 and 1')
+    if quantile_error is not None and not 0 < quantile_error < 1:
+        raise Exception('quantile_error must be between 0 and 1')
+    names = [get_quantile_name(quantile) for quantile in quantiles]
+    median_name = min(zip(quantiles, names), key=lambda q: abs(q[0] - 0.5))[1]
+
+    with plot_profile._stage('aggregate_group_quantiles', n_rows=len(data)):
+        values = (
+            data.lazy()
+            .select(
+                'timestamp',
+                group_column,
+                pl.col(metric_column).cast(pl.Float64).fill_nan(None),
+            )
+            .drop_nulls(metric_column)
+        )
+        if quantile_error is None:
+            long = (
+                values.group_by('timestamp', group_column)
+                .agg(
+                    pl.len().alias('n'),
+                    *[
+                        pl.col(metric_column)
+                        .quantile(quantile, 'linear')
+                        .alias(name)
+                        for quantile, name in zip(quantiles, names)
+                    ],
+                )
+                .collect()
+            )
+        else:
+            long = _aggregate_bucket_quantiles(
+                values,
+                group_column=group_column,
+                metric_column=metric_column,
+                quantiles=quantiles,
+                names=names,
+                quantile_error=quantile_error,
+            )
+
+        ranking = (
+            long.group_by(group_column)
+            .agg(pl.sum('n'))
+            .sort('n', descending=True)[group_column]
+        )
+        long = long.with_columns(pl.col(group_column).cast(pl.String)).sort(
+            'timestamp'
+        )
+        matrix = long.pivot(
+            on=group_column,
+            index='timestamp',
+            values=median_name,
+            aggregate_function=None,
+        ).sort('timestamp')
+    return {'ranking': ranking, 'matrix': matrix, 'quantiles': long}
+
+
+def _aggregate_bucket_quantiles(
+    values: pl.LazyFrame,
+    *,
+    group_column: str,
+    metric_column: str,
+    quantiles: typing.Sequence[float],
+    names: typing.Sequence[str],
+    quantile_error: float,
+) -> pl.DataFrame:
+    """approximate quantiles from counts of log-spaced buckets
+
+    bucket k of positive values spans (gamma ** (k - 1), gamma ** k], and its
+    center 2 * gamma ** k / (gamma + 1) is within quantile_error of all of it.
+    counting runs on the streaming engine, so values are never gathered per
+    group the way exact quantiles need them
+    """
+    import math
+
+    import polars as pl
+
+    gamma = (1 + quantile_error) / (1 - quantile_error)
+    value = pl.col(metric_column)
+    index = (value.abs().log() / math.log(gamma)).ceil()
+    keys = ['timestamp', group_column]
+    counts = (
+        values.select(
+            *keys,
+            value.sign().cast(pl.Int8).alias('_sign'),
+            pl.when(value != 0)
+            .then(index)
+            .otherwise(0)
+            .cast(pl.Int64)
+            .alias('_index'),
+        )
+        .group_by(*keys, '_sign', '_index')
+        .agg(pl.len().alias('_count'))
+        .collect(engine='streaming')
+        .sort(*keys, '_sign', pl.col('_sign') * pl.col('_index'))
+    )
+    center = pl.col('_sign') * 2 * pl.lit(gamma).pow('_index') / (gamma + 1)
+    counts = counts.with_columns(
+        center.alias('_center'),
+        pl.col('_count').cum_sum().over(keys).alias('_cumulative'),
+    )
+
+    # quantile q is the value of rank ceil(q * n), counting ranks from 1
+    n = pl.col('_count').sum()
+    return counts.group_by(keys).agg(
+        n.alias('n'),
+        *[
+            pl.col('_center')
+            .filter(pl.col('_cumulative') >= (quantile * n).ceil().clip(1))
+            .first()
+            .alias(name)
+            for quantile, name in zip(quantiles, names)
+        ],
+    )
+
+
+def _get_matrix_columns(
+    groups: typing.Sequence[typing.Any],
+    aggregation: GroupAggregation | GroupQuantiles,
+) -> list[str]:
+    """get names of matrix columns of groups"""
+    import polars as pl
+
+    dtype = aggregation['ranking'].dtype
+    return pl.Series(list(groups), dtype=dtype).cast(pl.String).to_list()
+
+
+class GroupAggregationCache:
+    """memory-bounded LRU cache of aggregate_groups() results
+
+    entries are keyed by a fingerprint of the timestamp, group, and metric
+    columns. when spill_dir is given, evicted entries are written to Parquet
+    files there, named by a digest of those columns that is stable across
+    sessions, and loaded back on later misses
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = 256 * 1024 * 1024,
+        spill_dir: str | None = None,
+    ) -> None:
+        import collections
+
+        self.max_bytes = max_bytes
+        self.spill_dir = spill_dir
+        # key -> (aggregation, n_bytes, spill_key)
+        self.entries: collections.OrderedDict[
+            str, tuple[GroupAggregation, int, str | None]
+        ] = collections.OrderedDict()
+        self.n_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.spill_hits = 0
+        self.evictions = 0
+
+    def get(
+        self,
+        data: pl.DataFrame,
+        *,
+        group_column: str,
+        metric_column: str,
+    ) -> GroupAggregation:
+        """get aggregation of data, computing it if not cached"""
+        key = get_aggregation_key(
+            data, group_column=group_column, metric_column=metric_column
+        )
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return entry[0]
+
+        self.misses += 1
+        spill_key = None
+        aggregation = None
+        if self.spill_dir is not None:
+            spill_key = get_spill_key(
+                data, group_column=group_column, metric_column=metric_column
+            )
+            aggregation = self._load_spilled(spill_key)
+        if aggregation is not None:
+            self.spill_hits += 1
+        else:
+            aggregation = aggregate_groups(
+                data, group_column=group_column, metric_column=metric_column
+            )
+        self._insert(key, aggregation, spill_key)
+        return aggregation
+
+    def stats(self) -> dict[str, int]:
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'spill_hits': self.spill_hits,
+            'evictions': self.evictions,
+            'n_entries': len(self.entries),
+            'n_bytes': self.n_bytes,
+        }
+
+    def clear(self) -> None:
+        self.entries.clear()
+        self.n_bytes = 0
+
+    def _insert(
+        self,
+        key: str,
+        aggregation: GroupAggregation,
+        spill_key: str | None,
+    ) -> None:
+        n_bytes = int(
+            aggregation['matrix'].estimated_size()
+            + aggregation['ranking'].estimated_size()
+        )
+        if n_bytes > self.max_bytes:
+            self._spill(spill_key, aggregation)
+            return
+        self.entries[key] = (aggregation, n_bytes, spill_key)
+        self.n_bytes += n_bytes
+        while self.n_bytes > self.max_bytes:
+            _, (old_aggregation, old_bytes, old_spill_key) = (
+                self.entries.popitem(last=False)
+            )
+            self.n_bytes -= old_bytes
+            self.evictions += 1
+            self._spill(old_spill_key, old_aggregation)
+
+    def _get_spill_paths(self, key: str) -> tuple[str, str]:
+        import os
+
+        spill_dir: str = self.spill_dir  # type: ignore
+        prefix = os.path.join(spill_dir, 'group_aggregation_' + key)
+        return prefix + '.matrix.parquet', prefix + '.ranking.parquet'
+
+    def _spill(self, key: str | None, aggregation: GroupAggregation) -> None:
+        import os
+
+        if self.spill_dir is None or key is None:
+            return
+        matrix_path, ranking_path = self._get_spill_paths(key)
+        if os.path.exists(ranking_path):
+            return
+        os.makedirs(self.spill_dir, exist_ok=True)
+        aggregation['matrix'].write_parquet(matrix_path)
+        aggregation['ranking'].to_frame().write_parquet(ranking_path)
+
+    def _load_spilled(self, key: str) -> GroupAggregation | None:
+        import os
+        import polars as pl
+
+        matrix_path, ranking_path = self._get_spill_paths(key)
+        if not os.path.exists(ranking_path):
+            return None
+        return {
+            'matrix': pl.read_parquet(matrix_path),
+            'ranking': pl.read_parquet(ranking_path).to_series(),
+        }
+
+
+_default_cache: GroupAggregationCache | None = None
+
+# bump when the spill key format changes, so stale files are not loaded
+_spill_key_version = 3
+_spill_key_slice_size = 65536
+
+
+def get_default_aggregation_cache() -> GroupAggregationCache:
+    """get shared cache used by plot_groups(cache=True)"""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = GroupAggregationCache()
+    return _default_cache
+
+
+def get_aggregation_key(
+    data: pl.DataFrame,
+    *,
+    group_column: str,
+    metric_column: str,
+) -> str:
+    """fingerprint the columns that aggregate_groups() depends on
+
+    row hashes are summed, so the key does not depend on row order. polars
+    row hashes are only stable within a session, see get_spill_key()
+    """
+    columns = data.select('timestamp', group_column, metric_column)
+    row_hash = columns.hash_rows(seed=0).sum()
+    fingerprint = [len(columns), str(columns.schema), row_hash]
+    return str(fingerprint)
+
+
+def get_spill_key(
+    data: pl.DataFrame,
+    *,
+    group_column: str,
+    metric_column: str,
+) -> str:
+    """digest the columns that aggregate_groups() depends on
+
+    unlike get_aggregation_key(), the digest covers the column values
+    themselves, so it names spill files consistently across sessions and
+    polars versions. reordered rows get a different key
+    """
+    import hashlib
+
+    import polars as pl
+
+    columns = data.select('timestamp', group_column, metric_column)
+    header = [_spill_key_version, len(columns), str(columns.schema)]
+    digest = hashlib.sha256(str(header).encode())
+    # categorical codes depend on the string cache of the session
+    columns = columns.with_columns(
+        pl.col(pl.Categorical, pl.Enum).cast(pl.String)
+    )
+    for column in columns.iter_columns():
+        digest.update(column.is_null().to_numpy().tobytes())
+        physical = column.to_physical()
+        if physical.dtype.is_numeric() or physical.dtype == pl.Boolean:
+            digest.update(physical.fill_null(0).to_numpy().tobytes())
+        else:
+            strings = physical.cast(pl.String).fill_null('')
+            digest.update(strings.str.len_bytes().to_numpy().tobytes())
+            # join bounded slices rather than one string of the whole column
+            for offset in range(0, len(strings), _spill_key_slice_size):
+                chunk = strings.slice(offset, _spill_key_slice_size)
+                digest.update(chunk.str.join('').item().encode())
+    return digest.hexdigest()[:32]
+
+
+def add_rangeslider_overview(
+    fig: go.Figure | dict[str, typing.Any],
+    *,
+    matrix: pl.DataFrame,
+    columns: typing.Sequence[str],
+    colors: typing.Sequence[str | None],
+    rangeslider: typing.Literal['total', 'groups'],
+    max_points: int = 500,
+) -> None:
+    """draw decimated overview traces in the rangeslider instead of all data
+
+    plotly draws every trace of the rangeslider's x axis inside the slider.
+    so the plotted traces are moved to an invisible x axis that matches the
+    slider's axis, and the overview traces are placed on the slider's axis
+    with a y range that hides them from the main plot area
+
+    axes after remapping:
+    - xaxis: visible axis holding the rangeslider, draws overview traces
+    - yaxis: hidden, range [2, 3] above the overview, normalized to [0, 1]
+    - xaxis2: hidden, matches and overlays xaxis, draws plotted traces
+    - yaxis2: the previous yaxis, overlaying yaxis on the left
+
+    the plotted traces cannot stay on the primary axes, because plotly.py
+    only accepts slider y ranges for yaxis, and a fixed slider y range that
+    hides the plotted traces also masks the slider's selection box
+    """
+    import numpy as np
+    import polars as pl
+
+    from .. import plot_decimate
+
+    columns = [column for column in columns if column in matrix.columns]
+    if rangeslider == 'total':
+        overview = matrix.select(
+            'timestamp', pl.sum_horizontal(columns).alias('TOTAL')
+        )
+        overview_columns = ['TOTAL']
+        overview_colors: typing.Sequence[str | None] = ['black']
+    elif rangeslider == 'groups':
+        overview = matrix.select('timestamp', *columns)
+        overview_columns = columns
+        overview_colors = colors
+    else:
+        raise Exception('invalid rangeslider: ' + str(rangeslider))
+
+    # normalize to [0, 1] so that a fixed main-plot y range hides overview
+    values = overview.select(overview_columns).to_numpy().astype(float)
+    vmin, vmax = np.nanmin(values, initial=0), np.nanmax(values, initial=0)
+    scale = vmax - vmin if vmax > vmin else 1
+    timestamps = overview['timestamp'].to_numpy()
+    n_buckets = max(max_points // 4, 1)
+    overview_traces = []
+    for c, (column, color) in enumerate(zip(overview_columns, overview_colors)):
+        x, y = plot_decimate.decimate_minmax(
+            timestamps, (values[:, c] - vmin) / scale, n_buckets
+        )
+        overview_trace = dict(
+            type='scatter',
+            x=x,
+            y=y,
+            mode='lines',
+            line=dict(color=color, width=1),
+            hoverinfo='skip',
+            showlegend=False,
+            xaxis='x',
+            yaxis='y',
+        )
+        overview_traces.append(overview_trace)
+
+    # move plotted traces and their y axis off of the rangeslider's axes
+    if isinstance(fig, dict):
+        xaxis = fig['layout'].get('xaxis', {})
+        yaxis = fig['layout'].get('yaxis', {})
+    else:
+        xaxis = fig.layout.xaxis.to_plotly_json()
+        yaxis = fig.layout.yaxis.to_plotly_json()
+    xaxis2 = {
+        key: value
+        for key, value in xaxis.items()
+        if key not in ['rangeslider', 'range', 'title']
+    }
+    xaxis2.update(matches='x', overlaying='x', visible=False)
+    slider = dict(xaxis.get('rangeslider', {}), yaxis={'rangemode': 'auto'})
+    layout_update = dict(
+        xaxis=dict(xaxis, rangeslider=slider),
+        xaxis2=xaxis2,
+        yaxis2=dict(yaxis, overlaying='y', side='left'),
+        yaxis=dict(visible=False, fixedrange=True, range=[2, 3]),
+    )
+    if isinstance(fig, dict):
+        for trace in fig['data']:
+            trace.update(xaxis='x2', yaxis='y2')
+        fig['data'].extend(overview_traces)
+        fig['layout'].update(layout_update)
+    else:
+        fig.update_traces(xaxis='x2', yaxis='y2')
+        fig.add_traces(overview_traces)
+        fig.update_layout(layout_update, overwrite=True)
+    check_rangeslider_overview(fig, n_overview=len(overview_traces))
+
+
+def check_rangeslider_overview(
+    fig: go.Figure | dict[str, typing.Any], *, n_overview: int
+) -> None:
+    """check that only the last n_overview traces render in the rangeslider
+
+    the overview traces must be on axes x and y and within [0, 1], hidden by
+    the range of yaxis, and every other trace on axes x2 and y2
+    """
+    import numpy as np
+
+    if isinstance(fig, dict):
+        traces, layout = fig['data'], fig['layout']
+    else:
+        traces = [
+            {key: trace[key] for key in ['xaxis', 'yaxis', 'y']}
+            for trace in fig.data
+        ]
+        layout = fig.layout.to_plotly_json()
+
+    for t, trace in enumerate(traces):
+        axes = (trace.get('xaxis') or 'x', trace.get('yaxis') or 'y')
+        if t < len(traces) - n_overview:
+            if axes != ('x2', 'y2'):
+                raise Exception('plotted trace would render in rangeslider')
+        elif axes != ('x', 'y'):
+            raise Exception('overview trace is not on the rangeslider axes')
+        else:
+            y = np.asarray(trace['y'], dtype=float)
+            ymin, ymax = layout['yaxis']['range']
+            if np.any((y >= ymin) & (y <= ymax)):
+                raise Exception('overview trace would render in main plot')
+    xaxis2 = layout.get('xaxis2', {})
+    if xaxis2.get('matches') != 'x' or layout['yaxis'].get('visible', True):
+        raise Exception('rangeslider overview axes are not linked')
+
+
 def get_label_params() -> dict[str, typing.Any]:
     return {'size': 18, 'color': '#000000'}
 
 
 def get_grid_params(mode: PlotGroupsMode) -> dict[str, typing.Any]:
-    if mode == 'area_%':
+    if mode in ['area_%', 'heatmap']:
         return dict(showgrid=False)
     else:
         return dict(
@@ -423,7 +1502,15 @@ def get_yaxis_params(
     total: pl.DataFrame | None = None,
     metric_column: str,
 ) -> dict[str, typing.Any]:
-    if mode == 'area_%':
+    if mode == 'heatmap':
+        return dict(
+            type='category',
+            autorange='reversed',
+            fixedrange=False,
+            tickfont=label_style,
+            showgrid=False,
+        )
+    elif mode == 'area_%':
         return dict(
             title={
                 'text': 'Share of ' + metric_name,
@@ -1,8 +1,14 @@
 from __future__ import annotations
 
+import typing
+
 import matplotlib.pyplot as plt
 import numpy as np
 
+if typing.TYPE_CHECKING:
+    import numpy.typing as npt
+    import plotly.graph_objects as go  # type: ignore
+
 
 def plot_log_x_histogram(
     x,
@@ -12,13 +18,7 @@ def plot_log_x_histogram(
     bin_min=None,
     **bin_kwargs,
 ):
-    if xlim is None:
-        if bin_min is None:
-            xmin = max(min(x), 0.00000000001)
-        else:
-            xmin = bin_min
-        xlim = [xmin, max(x)]
-    bins = np.logspace(np.log10(xlim[0]), np.log10(xlim[1]), n_bins)
+    bins = get_log_bins(x, xlim=xlim, n_bins=n_bins, bin_min=bin_min)
 
     plt.hist(x, *bin_args, bins=bins, **bin_kwargs)
 
@@ -26,3 +26,91 @@ def plot_log_x_histogram(
     #     plt.hist(counts, bins=bins, **bin_kwargs)
 
     plt.xscale('log')
+
+
+def plot_log_x_histogram_plotly(
+    x: npt.ArrayLike,
+    *,
+    xlim: typing.Sequence[float] | None = None,
+    n_bins: int = 30,
+    bin_min: float | None = None,
+    color: str | None = None,
+    title: str | None = None,
+    xlabel: str | None = None,
+    ylabel: str | None = 'count',
+    tick_format: typing.Mapping[str, typing.Any] | None = None,
+    show: bool | None = None,
+    show_kwargs: dict[str, typing.Any] | None = None,
+    html_path: str | None = None,
+    html_kwargs: dict[str, typing.Any] | None = None,
+    png_path: str | None = None,
+    png_kwargs: dict[str, typing.Any] | None = None,
+) -> go.Figure:
+    """plot log x histogram with plotly, using the bins of plot_log_x_histogram
+
+    values are binned here instead of in the browser, so the figure only
+    holds the bin counts. bars are placed in log10(x) units, with ticks at
+    powers of ten labeled in x units
+    """
+    import plotly.graph_objects as go
+
+    from .. import plotly_utils
+
+    bins = get_log_bins(x, xlim=xlim, n_bins=n_bins, bin_min=bin_min)
+    counts, _ = np.histogram(np.asarray(x), bins)
+    log_edges = np.log10(bins)
+
+    fig = go.Figure(
+        go.Bar(
+            x=(log_edges[:-1] + log_edges[1:]) / 2,
+            y=counts,
+            width=np.diff(log_edges),
+            customdata=np.stack([bins[:-1], bins[1:]], axis=-1),
+            marker=dict(color=color, line=dict(width=0)),
+            hovertemplate=(
+                '%{customdata[0]:.4g} - %{customdata[1]:.4g}: %{y:,}'
+                '<extra></extra>'
+            ),
+        )
+    )
+    fig.update_layout(
+        template='plotly_white',
+        title=title,
+        bargap=0,
+        xaxis=dict(
+            title=xlabel,
+            range=[log_edges[0], log_edges[-1]],
+            **plotly_utils.get_log_axis_ticks(
+                log_edges[0], log_edges[-1], tick_format
+            ),
+        ),
+        yaxis=dict(title=ylabel),
+    )
+
+    plotly_utils._output_figure(
+        fig=fig,
+        show=show,
+        show_kwargs=show_kwargs,
+        html_path=html_path,
+        html_kwargs=html_kwargs,
+        png_path=png_path,
+        png_kwargs=png_kwargs,
+    )
+    return fig
+
+
+def get_log_bins(
+    x: npt.ArrayLike,
+    xlim: typing.Sequence[float] | None = None,
+    n_bins: int = 30,
+    bin_min: float | None = None,
+) -> np.ndarray[typing.Any, np.dtype[np.float64]]:
+    """get n_bins log-spaced bin edges spanning xlim, default data range"""
+    if xlim is None:
+        array = np.asarray(x)
+        if bin_min is None:
+            xmin = max(float(np.nanmin(array)), 0.00000000001)
+        else:
+            xmin = bin_min
+        xlim = [xmin, float(np.nanmax(array))]
+    return np.logspace(np.log10(xlim[0]), np.log10(xlim[1]), n_bins)
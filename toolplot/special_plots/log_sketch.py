@@ -0,0 +1,344 @@
+"""mergeable log-bucketed sketches of value distributions
+
+a LogSketch counts values in buckets whose bounds grow by a factor of gamma,
+like DDSketch. every quantile it reports is within relative_error of the
+exact quantile, relative to the exact value's magnitude, without knowing the
+range of values up front
+
+sketches of the same relative_error can be merged, e.g. across processes or
+files, and serialize to a few kB with to_bytes()
+"""
+
+from __future__ import annotations
+
+import typing
+
+import matplotlib.pyplot as plt
+
+if typing.TYPE_CHECKING:
+    import numpy as np
+    import numpy.typing as npt
+
+
+_magic = b'TPLS'
+_version = 1
+_header_format = '<4sBdqQdddqQqQ'
+
+
+class LogSketch:
+    """DDSketch-style sketch with a guaranteed relative error
+
+    bucket k of magnitudes spans (gamma ** (k - 1), gamma ** k], and holds
+    separate counts for positive and negative values. zeros are counted
+    apart. count, sum, min, and max are exact
+
+    each sign keeps at most max_buckets buckets. beyond that, the buckets
+    of smallest magnitude are merged, so only the smallest values lose
+    their error guarantee
+    """
+
+    def __init__(
+        self,
+        relative_error: float = 0.01,
+        max_buckets: int | None = 2048,
+    ) -> None:
+        import math
+
+        import numpy as np
+
+        if not 0 < relative_error < 1:
+            raise Exception('relative_error must be between 0 and 1')
+        if max_buckets is not None and max_buckets < 1:
+            raise Exception('max_buckets must be at least 1')
+        self.relative_error = relative_error
+        self.max_buckets = max_buckets
+        self.gamma = (1 + relative_error) / (1 - relative_error)
+        self._log_gamma = math.log(self.gamma)
+
+        # counts of buckets offset, offset + 1, ... for each sign
+        self.positive = np.zeros(0, dtype=np.int64)
+        self.positive_offset = 0
+        self.negative = np.zeros(0, dtype=np.int64)
+        self.negative_offset = 0
+        self.zero_count = 0
+        self.sum = 0.0
+        self.min = float('inf')
+        self.max = float('-inf')
+
+    @property
+    def count(self) -> int:
+        return int(self.positive.sum() + self.negative.sum() + self.zero_count)
+
+    def add(self, values: npt.ArrayLike) -> None:
+        """add a chunk of values, ignoring nan and infinite values"""
+        import numpy as np
+
+        array = np.asarray(values, dtype=float).ravel()
+        array = array[np.isfinite(array)]
+        if len(array) == 0:
+            return
+        self.sum += float(array.sum())
+        self.min = min(self.min, float(array.min()))
+        self.max = max(self.max, float(array.max()))
+
+        self.zero_count += int(np.count_nonzero(array == 0))
+        for sign in [1, -1]:
+            magnitudes = sign * array[sign * array > 0]
+            if len(magnitudes) == 0:
+                continue
+            indices = np.ceil(np.log(magnitudes) / self._log_gamma)
+            indices = indices.astype(np.int64)
+            offset = int(indices.min())
+            counts = np.bincount(indices - offset)
+            self._add_counts(sign, counts, offset)
+
+    def merge(self, other: LogSketch) -> None:
+        """add the counts of other, which must have the same relative_error"""
+        if other.gamma != self.gamma:
+            raise Exception('cannot merge sketches of different relative_error')
+        self._add_counts(1, other.positive, other.positive_offset)
+        self._add_counts(-1, other.negative, other.negative_offset)
+        self.zero_count += other.zero_count
+        self.sum += other.sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def quantile(
+        self, quantiles: float | npt.ArrayLike
+    ) -> float | np.ndarray[typing.Any, np.dtype[np.float64]]:
+        """get value of rank ceil(q * count) for each quantile q
+
+        values are bucket centers, clipped to the exact min and max
+        """
+        import numpy as np
+
+        q = np.asarray(quantiles, dtype=float)
+        if np.any((q < 0) | (q > 1)):
+            raise Exception('quantiles must be between 0 and 1')
+        values, counts = self.get_buckets(include_nonpositive=True)
+        n = int(counts.sum())
+        if n == 0:
+            result = np.full(q.shape, np.nan)
+        else:
+            ranks = np.clip(np.ceil(q * n), 1, n)
+            positions = np.searchsorted(np.cumsum(counts), ranks, side='left')
+            result = values[positions]
+        if result.ndim == 0:
+            return float(result)
+        return result
+
+    def get_buckets(
+        self, include_nonpositive: bool = False
+    ) -> tuple[
+        np.ndarray[typing.Any, np.dtype[np.float64]],
+        np.ndarray[typing.Any, np.dtype[np.int64]],
+    ]:
+        """get ascending bucket centers and counts of non-empty buckets
+
+        centers are clipped to the exact min and max. without
+        include_nonpositive, only buckets of positive values are returned
+        """
+        import numpy as np
+
+        parts = [self._get_centers(1)]
+        if include_nonpositive:
+            negative_values, negative_counts = self._get_centers(-1)
+            parts = [
+                (-negative_values[::-1], negative_counts[::-1]),
+                (np.zeros(1), np.array([self.zero_count], dtype=np.int64)),
+                *parts,
+            ]
+        values = np.concatenate([part[0] for part in parts])
+        counts = np.concatenate([part[1] for part in parts])
+        values = np.clip(values, self.min, self.max)
+        return values[counts > 0], counts[counts > 0]
+
+    def to_bytes(self) -> bytes:
+        """serialize sketch
+
+        counts are stored in the smallest unsigned integer type that fits
+        them, and zlib-compressed
+        """
+        import struct
+        import zlib
+
+        import numpy as np
+
+        counts = np.concatenate([self.positive, self.negative])
+        itemsize = np.min_scalar_type(int(counts.max(initial=0))).itemsize
+        header = struct.pack(
+            _header_format,
+            _magic,
+            _version,
+            self.relative_error,
+            0 if self.max_buckets is None else self.max_buckets,
+            self.zero_count,
+            self.sum,
+            self.min,
+            self.max,
+            self.positive_offset,
+            len(self.positive),
+            self.negative_offset,
+            len(self.negative),
+        )
+        dtype = '<u' + str(itemsize)
+        payload = bytes([itemsize]) + counts.astype(dtype).tobytes()
+        return header + zlib.compress(payload)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> LogSketch:
+        """load sketch serialized by to_bytes()"""
+        import struct
+        import zlib
+
+        import numpy as np
+
+        header_size = struct.calcsize(_header_format)
+        fields = struct.unpack(_header_format, data[:header_size])
+        if fields[0] != _magic or fields[1] != _version:
+            raise Exception('data is not a serialized LogSketch')
+        (
+            relative_error,
+            max_buckets,
+            zero_count,
+            total,
+            vmin,
+            vmax,
+            positive_offset,
+            n_positive,
+            negative_offset,
+            n_negative,
+        ) = fields[2:]
+
+        payload = zlib.decompress(data[header_size:])
+        counts = np.frombuffer(payload[1:], dtype='<u' + str(payload[0]))
+        counts = counts.astype(np.int64)
+        if len(counts) != n_positive + n_negative:
+            raise Exception('serialized LogSketch is truncated')
+
+        sketch = cls(relative_error, max_buckets if max_buckets > 0 else None)
+        sketch.positive = counts[:n_positive]
+        sketch.positive_offset = positive_offset
+        sketch.negative = counts[n_positive:]
+        sketch.negative_offset = negative_offset
+        sketch.zero_count = zero_count
+        sketch.sum = total
+        sketch.min = vmin
+        sketch.max = vmax
+        return sketch
+
+    def _add_counts(
+        self,
+        sign: int,
+        counts: np.ndarray[typing.Any, typing.Any],
+        offset: int,
+    ) -> None:
+        import numpy as np
+
+        if len(counts) == 0:
+            return
+        if sign > 0:
+            store, store_offset = self.positive, self.positive_offset
+        else:
+            store, store_offset = self.negative, self.negative_offset
+        if len(store) == 0:
+            store_offset = offset
+
+        # grow store to span both index ranges, then add
+        start = min(store_offset, offset)
+        end = max(store_offset + len(store), offset + len(counts))
+        merged = np.zeros(end - start, dtype=np.int64)
+        merged[store_offset - start : store_offset - start + len(store)] = store
+        merged[offset - start : offset - start + len(counts)] += counts
+
+        # merge buckets of smallest magnitude beyond max_buckets
+        if self.max_buckets is not None and len(merged) > self.max_buckets:
+            n_collapsed = len(merged) - self.max_buckets + 1
+            merged[n_collapsed - 1] += merged[: n_collapsed - 1].sum()
+            merged = merged[n_collapsed - 1 :]
+            start += n_collapsed - 1
+
+        if sign > 0:
+            self.positive, self.positive_offset = merged, start
+        else:
+            self.negative, self.negative_offset = merged, start
+
+    def _get_centers(
+        self, sign: int
+    ) -> tuple[
+        np.ndarray[typing.Any, np.dtype[np.float64]],
+        np.ndarray[typing.Any, np.dtype[np.int64]],
+    ]:
+        """get ascending center magnitudes and counts of buckets of sign"""
+        import numpy as np
+
+        if sign > 0:
+            store, offset = self.positive, self.positive_offset
+        else:
+            store, offset = self.negative, self.negative_offset
+        indices = offset + np.arange(len(store))
+        centers = 2 * self.gamma ** indices.astype(float) / (self.gamma + 1)
+        return centers, store
+
+
+def merge_sketches(sketches: typing.Iterable[LogSketch]) -> LogSketch:
+    """merge sketches into a new sketch"""
+    merged: LogSketch | None = None
+    for sketch in sketches:
+        if merged is None:
+            merged = LogSketch(sketch.relative_error, sketch.max_buckets)
+        merged.merge(sketch)
+    if merged is None:
+        raise Exception('no sketches to merge')
+    return merged
+
+
+def plot_log_sketch_histogram(
+    sketch: LogSketch,
+    *,
+    xlim: tuple[float, float] | None = None,
+    n_bins: int = 30,
+    bin_min: float | None = None,
+    **hist_kwargs: typing.Any,
+) -> None:
+    """plot positive values of sketch like plot_log_x_histogram() plots values
+
+    bucket counts are placed in the bins of their centers
+    """
+    from . import log_histograms
+
+    centers, counts = sketch.get_buckets()
+    if len(centers) == 0:
+        raise Exception('sketch has no positive values')
+    bins = log_histograms.get_log_bins(
+        centers[[0, -1]], xlim=xlim, n_bins=n_bins, bin_min=bin_min
+    )
+    plt.hist(
+        centers, bins=bins.tolist(), weights=counts.astype(float), **hist_kwargs
+    )
+    plt.xscale('log')
+
+
+def plot_log_sketch_quantiles(
+    sketch: LogSketch,
+    *,
+    quantiles: npt.ArrayLike | None = None,
+    **plot_kwargs: typing.Any,
+) -> None:
+    """plot value of each quantile, on a logit quantile axis
+
+    default quantiles reach out to the tail that count resolves, e.g.
+    0.9999 for 10k values
+    """
+    import numpy as np
+
+    if quantiles is None:
+        n_nines = max(np.log10(max(sketch.count, 10)), 1)
+        logits = np.linspace(-n_nines, n_nines, 400) * np.log(10)
+        quantiles = 1 / (1 + np.exp(-logits))
+    quantiles = np.asarray(quantiles, dtype=float)
+    values = sketch.quantile(quantiles)
+    plt.plot(quantiles, values, **plot_kwargs)
+    plt.xscale('logit')
+    if sketch.min > 0:
+        plt.yscale('log')
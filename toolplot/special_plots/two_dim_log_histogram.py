@@ -2,6 +2,25 @@ from __future__ import annotations
 
 import typing
 
+if typing.TYPE_CHECKING:
+    import numpy as np
+    import plotly.graph_objects as go  # type: ignore
+
+    from typing_extensions import TypedDict
+
+    class SparseHistogram2D(TypedDict):
+        """2d histogram counts in coordinate format, rows index y bins"""
+
+        rows: np.ndarray[typing.Any, typing.Any]
+        cols: np.ndarray[typing.Any, typing.Any]
+        counts: np.ndarray[typing.Any, typing.Any]
+        shape: tuple[int, int]
+        edges: list[np.ndarray[typing.Any, typing.Any]]
+
+
+# sparse binning counts with a dense bincount over at most this many bins
+max_bincount_span = 1_000_000
+
 
 def plot_2d_log_histogram(
     x_values: typing.Sequence[int | float],
@@ -22,37 +41,66 @@ def plot_2d_log_histogram(
     y_bin_min: float = 1e-14,
     colorbar_label: str | None = None,
     ctick_format: typing.Mapping[str, typing.Any] | None = None,
-) -> None:
+    sparse: bool = False,
+    downsample: bool = True,
+    dpi: float | None = None,
+) -> typing.Any:
+    """plot 2d histogram as an image
+
+    counts are binned into sparse integer storage. with downsample, bins are
+    summed down to the axes' pixel resolution at dpi before drawing, so the
+    image never holds more cells than the axes has pixels. dpi defaults to
+    the figure's dpi, pass the dpi of savefig() to keep detail when saving
+    at a higher resolution
+
+    returns (dense_counts, [y_edges, x_edges]) like np.histogramdd, which
+    allocates the full grid of bins. sparse=True instead returns the
+    full-resolution counts as a SparseHistogram2D
+    """
     import matplotlib.colors as mcolors
     from matplotlib.ticker import FixedLocator
     import matplotlib.pyplot as plt
     import numpy as np
     import toolstr
 
-    if log_x or log_y:
-        bins = create_2d_bins(
-            log_x=log_x,
-            log_y=log_y,
-            bins=bins,
-            x_values=x_values,
-            y_values=y_values,
-            x_bin_min=x_bin_min,
-            y_bin_min=y_bin_min,
-        )
-    elif isinstance(bins, (list, tuple)):
-        bins = [bins[1], bins[0]]
-    elif isinstance(bins, int):
-        bins = [bins, bins]
-    else:
-        raise Exception('invalid bin format')
-    hist = np.histogramdd([y_values, x_values], bins)
+    bins = _get_2d_bins(
+        x_values, y_values, bins, log_x, log_y, x_bin_min, y_bin_min
+    )
+    hist = histogram_2d_sparse(x_values, y_values, bins=bins)
+    edges = hist['edges']
 
     if log:
         norm = mcolors.LogNorm()
     else:
         norm = None
 
-    plt.imshow(hist[0], norm=norm, cmap=cmap, origin='lower')
+    if downsample:
+        ax = plt.gca()
+        bbox = ax.get_window_extent()
+        pixel_scale = 1.0 if dpi is None else dpi / ax.figure.dpi
+        factors = (
+            int(np.ceil(hist['shape'][0] / max(bbox.height * pixel_scale, 1))),
+            int(np.ceil(hist['shape'][1] / max(bbox.width * pixel_scale, 1))),
+        )
+    else:
+        factors = (1, 1)
+    image = downsample_sparse_histogram(hist, factors)
+    ny, nx = hist['shape']
+    plt.imshow(
+        image,
+        norm=norm,
+        cmap=cmap,
+        origin='lower',
+        extent=(
+            -0.5,
+            image.shape[1] * factors[1] - 0.5,
+            -0.5,
+            image.shape[0] * factors[0] - 0.5,
+        ),
+        interpolation='nearest',
+    )
+    plt.xlim(-0.5, nx - 0.5)
+    plt.ylim(-0.5, ny - 0.5)
 
     if colorbar:
         cbar = plt.colorbar()
@@ -67,12 +115,269 @@ def plot_2d_log_histogram(
             cbar.ax.set_yticklabels(ctick_labels)
 
     # ticks
-    xtick_locs, xtick_labels = get_ticks(hist[1][1], xtick_format, n_xticks)
+    xtick_locs, xtick_labels = get_ticks(edges[1], xtick_format, n_xticks)
     plt.xticks(xtick_locs, xtick_labels, rotation=270)
-    ytick_locs, ytick_labels = get_ticks(hist[1][0], ytick_format, n_yticks)
+    ytick_locs, ytick_labels = get_ticks(edges[0], ytick_format, n_yticks)
     plt.yticks(ytick_locs, ytick_labels)
 
-    return hist
+    if sparse:
+        return hist
+    else:
+        return sparse_histogram_to_dense(hist), edges
+
+
+def plot_2d_log_histogram_plotly(
+    x_values: typing.Sequence[int | float],
+    y_values: typing.Sequence[int | float],
+    bins: int
+    | tuple[int, int]
+    | tuple[typing.Sequence[int | float], typing.Sequence[int | float]] = 10,
+    *,
+    colorscale: str = 'Viridis',
+    log: bool = True,
+    log_x: bool = False,
+    log_y: bool = False,
+    x_bin_min: float = 1e-14,
+    y_bin_min: float = 1e-14,
+    xtick_format: typing.Mapping[str, typing.Any] | None = None,
+    ytick_format: typing.Mapping[str, typing.Any] | None = None,
+    colorbar_label: str | None = None,
+    title: str | None = None,
+    xlabel: str | None = None,
+    ylabel: str | None = None,
+    show: bool | None = None,
+    show_kwargs: dict[str, typing.Any] | None = None,
+    html_path: str | None = None,
+    html_kwargs: dict[str, typing.Any] | None = None,
+    png_path: str | None = None,
+    png_kwargs: dict[str, typing.Any] | None = None,
+) -> go.Figure:
+    """plot 2d histogram as a plotly heatmap, using the bins of
+    plot_2d_log_histogram
+
+    values are binned here instead of in the browser, so the figure only
+    holds the bin counts. log axes are placed in log10 units, with ticks at
+    powers of ten labeled in original units. with log, colors are scaled by
+    log10 of counts and empty bins are left blank
+    """
+    import numpy as np
+    import plotly.graph_objects as go
+
+    from .. import plotly_utils
+
+    yx_bins = _get_2d_bins(
+        x_values, y_values, bins, log_x, log_y, x_bin_min, y_bin_min
+    )
+    hist = histogram_2d_sparse(x_values, y_values, bins=yx_bins)
+    y_edges, x_edges = hist['edges']
+
+    counts = sparse_histogram_to_dense(hist)
+    colorbar: dict[str, typing.Any] = {'title': {'text': colorbar_label}}
+    heatmap_kwargs: dict[str, typing.Any]
+    if log:
+        z = np.full(counts.shape, np.nan)
+        nonzero = counts > 0
+        z[nonzero] = np.log10(counts[nonzero])
+        if nonzero.any():
+            colorbar.update(
+                plotly_utils.get_log_axis_ticks(
+                    0, np.nanmax(z), {'decimals': 0}
+                )
+            )
+        # colors are log10 counts, so hover counts need their own grid
+        if counts.max(initial=0) < 2**32:
+            customdata = counts.astype(np.uint32)
+        else:
+            customdata = counts
+        heatmap_kwargs = {
+            'customdata': customdata,
+            'hovertemplate': 'x: %{x}<br>y: %{y}<br>count: %{customdata:,}'
+            '<extra></extra>',
+        }
+    else:
+        z = counts
+        heatmap_kwargs = {
+            'hovertemplate': 'x: %{x}<br>y: %{y}<br>count: %{z:,}'
+            '<extra></extra>',
+        }
+
+    x, xaxis = _get_plotly_axis(x_edges, log_x, xtick_format)
+    y, yaxis = _get_plotly_axis(y_edges, log_y, ytick_format)
+    fig = go.Figure(
+        go.Heatmap(
+            x=x,
+            y=y,
+            z=z,
+            colorscale=colorscale,
+            colorbar=colorbar,
+            **heatmap_kwargs,
+        )
+    )
+    fig.update_layout(
+        template='plotly_white',
+        title=title,
+        xaxis=dict(xaxis, title=xlabel),
+        yaxis=dict(yaxis, title=ylabel),
+    )
+
+    plotly_utils._output_figure(
+        fig=fig,
+        show=show,
+        show_kwargs=show_kwargs,
+        html_path=html_path,
+        html_kwargs=html_kwargs,
+        png_path=png_path,
+        png_kwargs=png_kwargs,
+    )
+    return fig
+
+
+def _get_plotly_axis(
+    edges: np.ndarray[typing.Any, typing.Any],
+    log: bool,
+    tick_format: typing.Mapping[str, typing.Any] | None,
+) -> tuple[np.ndarray[typing.Any, typing.Any], dict[str, typing.Any]]:
+    """get heatmap cell edges and axis params, in log10 units if log"""
+    import numpy as np
+
+    from .. import plotly_utils
+
+    if log:
+        edges = np.log10(edges)
+        ticks = plotly_utils.get_log_axis_ticks(
+            edges[0], edges[-1], tick_format
+        )
+    else:
+        ticks = {}
+    return edges, dict(range=[edges[0], edges[-1]], **ticks)
+
+
+def _get_2d_bins(
+    x_values: typing.Sequence[int | float],
+    y_values: typing.Sequence[int | float],
+    bins: typing.Any,
+    log_x: bool,
+    log_y: bool,
+    x_bin_min: float,
+    y_bin_min: float,
+) -> typing.Any:
+    """get bins as [y_bins, x_bins] for histogram_2d_sparse()"""
+    if log_x or log_y:
+        return create_2d_bins(
+            log_x=log_x,
+            log_y=log_y,
+            bins=bins,
+            x_values=x_values,
+            y_values=y_values,
+            x_bin_min=x_bin_min,
+            y_bin_min=y_bin_min,
+        )
+    elif isinstance(bins, (list, tuple)):
+        return [bins[1], bins[0]]
+    elif isinstance(bins, int):
+        return [bins, bins]
+    else:
+        raise Exception('invalid bin format')
+
+
+def histogram_2d_sparse(
+    x_values: typing.Sequence[int | float],
+    y_values: typing.Sequence[int | float],
+    bins: typing.Sequence[int | typing.Sequence[int | float]],
+) -> SparseHistogram2D:
+    """bin values like np.histogramdd([y_values, x_values], bins)
+
+    only nonzero bins are stored, with the smallest unsigned integer dtype
+    that holds the counts
+    """
+    import numpy as np
+
+    x_array = np.asarray(x_values)
+    y_array = np.asarray(y_values)
+    y_edges = _get_bin_edges(y_array, bins[0])
+    x_edges = _get_bin_edges(x_array, bins[1])
+    ny = len(y_edges) - 1
+    nx = len(x_edges) - 1
+
+    rows = _get_bin_indices(y_array, y_edges)
+    cols = _get_bin_indices(x_array, x_edges)
+    valid = (rows >= 0) & (cols >= 0)
+    keys = rows[valid] * nx + cols[valid]
+
+    # count with bincount over the span of occurring keys if it is small
+    if len(keys) > 0:
+        first = keys.min()
+        span = keys.max() - first + 1
+    else:
+        first, span = 0, 0
+    if span <= max_bincount_span:
+        dense = np.bincount(keys - first, minlength=span)
+        keys = np.flatnonzero(dense)
+        counts = dense[keys]
+        keys = keys + first
+    else:
+        keys, counts = np.unique(keys, return_counts=True)
+    if len(counts) > 0:
+        counts = counts.astype(np.min_scalar_type(counts.max()))
+
+    return {
+        'rows': (keys // nx).astype(np.intp),
+        'cols': (keys % nx).astype(np.intp),
+        'counts': counts,
+        'shape': (ny, nx),
+        'edges': [y_edges, x_edges],
+    }
+
+
+def downsample_sparse_histogram(
+    hist: SparseHistogram2D, factors: tuple[int, int]
+) -> np.ndarray[typing.Any, typing.Any]:
+    """sum blocks of factors[0] x factors[1] bins into a dense float array"""
+    import numpy as np
+
+    fy, fx = factors
+    ny = -(-hist['shape'][0] // fy)
+    nx = -(-hist['shape'][1] // fx)
+    keys = (hist['rows'] // fy) * nx + hist['cols'] // fx
+    dense = np.bincount(keys, weights=hist['counts'], minlength=ny * nx)
+    return dense.reshape(ny, nx)
+
+
+def sparse_histogram_to_dense(
+    hist: SparseHistogram2D,
+) -> np.ndarray[typing.Any, typing.Any]:
+    """convert sparse histogram to dense float array like np.histogramdd"""
+    import numpy as np
+
+    dense = np.zeros(hist['shape'])
+    dense[hist['rows'], hist['cols']] = hist['counts']
+    return dense
+
+
+def _get_bin_edges(
+    values: np.ndarray[typing.Any, typing.Any],
+    bins: int | typing.Sequence[int | float],
+) -> np.ndarray[typing.Any, typing.Any]:
+    import numpy as np
+
+    if isinstance(bins, (int, np.integer)):
+        return np.histogram_bin_edges(values, bins=int(bins))
+    else:
+        return np.asarray(bins, dtype=float)
+
+
+def _get_bin_indices(
+    values: np.ndarray[typing.Any, typing.Any],
+    edges: np.ndarray[typing.Any, typing.Any],
+) -> np.ndarray[typing.Any, typing.Any]:
+    """get bin of each value, or -1 if outside of edges"""
+    import numpy as np
+
+    n_bins = len(edges) - 1
+    indices = np.searchsorted(edges, values, side='right') - 1
+    indices[values == edges[-1]] = n_bins - 1
+    indices[(indices < 0) | (indices >= n_bins)] = -1
+    return indices
 
 
 def get_ticks(
@@ -85,11 +390,12 @@ def get_ticks(
         format = {}
 
     locs = np.arange(len(bins)) - 0.5
-    labels = [toolstr.format_number(value, **format) for value in bins]
     if n_ticks is not None:
         indices = np.linspace(0, len(locs) - 1, n_ticks).astype(int)
-        locs = locs[indices]
-        labels = [labels[index] for index in indices]
+    else:
+        indices = np.arange(len(locs))
+    locs = locs[indices]
+    labels = [toolstr.format_number(bins[index], **format) for index in indices]
     return locs, labels
 
 
@@ -142,7 +448,7 @@ def create_lin_bins(
 ) -> typing.Sequence[float]:
     import numpy as np
 
-    return np.linspace(min(values), max(values), n_bins)
+    return np.linspace(np.min(values), np.max(values), n_bins)
 
 
 def create_log_bins(
@@ -156,8 +462,8 @@ def create_log_bins(
         n_bins = 10
     if bin_min is None:
         bin_min = 1e-15
-    min_value = min(values)
+    min_value = np.min(values)
     if bin_min is not None:
         min_value = max(min_value, bin_min)
-    max_value = max(values)
+    max_value = np.max(values)
     return np.logspace(np.log10(min_value), np.log10(max_value), n_bins)